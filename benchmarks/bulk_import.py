@@ -0,0 +1,101 @@
+"""
+Measures a bulk import of a synthetic directory of 20k dated notes into a
+new journal, split into scanning, reading, merging, and encrypting and saving.
+
+Usage: python3 benchmarks/bulk_import.py [FILES] [WORKERS]
+"""
+
+# bulk_import.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import sys
+import time
+import random
+import datetime
+import tempfile
+import importlib.util
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+spec = importlib.util.spec_from_file_location('journal', os.path.join(SRC, '__init__.py'),
+                                              submodule_search_locations=[SRC])
+sys.modules['journal'] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sys.modules['journal'])
+
+# pylint: disable=wrong-import-position
+from journal import core, importer, storage
+
+WORDS = ('the quick brown fox jumps over lazy dog walked to work today rain sun '
+         'coffee meeting dinner read book slept well tired happy garden call').split()
+
+
+def write_notes(directory, count, seed=1):
+    """Write `count` notes of a few hundred to a few thousand characters, one per
+    day, alternating between year/YYYY-MM-DD.md and year/MM/DD.txt layouts."""
+    rng = random.Random(seed)
+    start = datetime.date(1970, 1, 1)
+    for i in range(count):
+        day = start + datetime.timedelta(days=i)
+        name = f'{day.isoformat()}.md' if i % 2 else os.path.join(f'{day:%m}', f'{day:%d}.txt')
+        path = os.path.join(directory, str(day.year), name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wt', encoding='UTF-8') as file:
+            file.write(' '.join(rng.choices(WORDS, k=rng.randint(40, 600))))
+
+
+def main():
+    """Run the benchmark and print the time and throughput of each stage."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    with tempfile.TemporaryDirectory() as directory:
+        notes = os.path.join(directory, 'notes')
+        write_notes(notes, count)
+        journal_path = os.path.join(directory, 'journal')
+        journal = core.Journal(journal_path, 'benchmark', lazy=True, workers=workers,
+                               storage_format=storage.LogFormat)
+        timings = []
+
+        start = time.perf_counter()
+        files, _ = importer.find_files(notes)
+        timings.append(('scan', time.perf_counter() - start))
+
+        start = time.perf_counter()
+        records = list(importer.read_files(files))
+        timings.append(('read', time.perf_counter() - start))
+
+        start = time.perf_counter()
+        counts = journal.import_entries(records, save=False)
+        timings.append(('merge', time.perf_counter() - start))
+
+        start = time.perf_counter()
+        journal.save()
+        timings.append(('encrypt + save', time.perf_counter() - start))
+
+        assert counts['added'] == count
+        size = os.path.getsize(journal_path)
+        text_size = sum(len(text) for _, text in records)
+    total = sum(seconds for _, seconds in timings)
+    print(f'{count} files, {text_size / 2**20:.1f} MiB of text, journal {size / 2**20:.1f} MiB, '
+          f'{journal.batch_cipher().workers} workers')
+    print(f'{"stage":<16} {"s":>8} {"files/s":>10}')
+    for stage, seconds in timings + [('total', total)]:
+        print(f'{stage:<16} {seconds:>8.3f} {count / seconds:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares the cipher engines: per-entry encryption and decryption throughput,
+ciphertext overhead and journal file size, on the synthetic corpus of
+journal_suite.py.
+
+Usage: python3 benchmarks/cipher_engines.py [--entries 10000]
+"""
+
+# cipher_engines.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import time
+import argparse
+import tempfile
+
+# these import the src directory as the journal package
+from compression import synthetic_records
+from journal_suite import PASSWORD
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from journal import core, crypto, storage
+
+
+def throughput(key, records):
+    """Encrypt then decrypt each of `records` one at a time, returning
+    (encrypt seconds, decrypt seconds, ciphertext bytes)."""
+    start = time.perf_counter()
+    ciphertexts = [key.encrypt(date, text) for date, text in records]
+    encrypt_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for (date, text), ciphertext in zip(records, ciphertexts):
+        assert key.decrypt(date, ciphertext) == text
+    decrypt_time = time.perf_counter() - start
+    return encrypt_time, decrypt_time, sum(len(ciphertext) for ciphertext in ciphertexts)
+
+
+def file_size(directory, records, cipher):
+    """Get the size of a new log journal of `records` encrypted with `cipher`."""
+    file_path = os.path.join(directory, f'{cipher}.journal')
+    journal = core.Journal(file_path, PASSWORD, storage_format=storage.LogFormat, cipher=cipher)
+    journal.import_entries(records)
+    return os.path.getsize(file_path)
+
+
+def main():
+    """Measure each engine and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--entries', type=int, default=10000, help='synthetic entries to generate')
+    args = parser.parse_args()
+    records = synthetic_records(args.entries)
+    text_bytes = sum(len(text.encode('utf-8')) for _, text in records)
+    print(f'{len(records)} entries, {text_bytes / 2**20:.1f} MiB of text, one thread')
+    print(f'{"cipher":<18} {"encrypt MiB/s":>14} {"decrypt MiB/s":>14} {"bytes/entry":>12} {"file MiB":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for cipher in crypto.ENGINES:
+            key = crypto.KeyContext(PASSWORD, iterations=1000, cipher=cipher)  # the KDF is not under test
+            encrypt_time, decrypt_time, ciphertext_bytes = throughput(key, records)
+            overhead = (ciphertext_bytes - text_bytes) / len(records)
+            size = file_size(directory, records, cipher)
+            print(f'{cipher:<18} {text_bytes / 2**20 / encrypt_time:>14.1f} {text_bytes / 2**20 / decrypt_time:>14.1f} '
+                  f'{overhead:>+12.1f} {size / 2**20:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Compares journal size, open time and save time with each way of compressing
+entries, on the synthetic corpus of journal_suite.py or on a directory of
+dated notes such as `journal import` reads.
+
+Usage: python3 benchmarks/compression.py [--entries 10000] [--corpus DIR]
+"""
+
+# compression.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import time
+import random
+import argparse
+import tempfile
+
+# journal_suite imports the src directory as the journal package
+from journal_suite import PASSWORD, key_of, synthetic_entry, vocabulary
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from journal import core, crypto, importer, storage
+
+# (name, method, dictionary)
+VARIANTS = [
+    ('none', None, False),
+    ('zlib', 'zlib', False),
+    ('zlib+dictionary', 'zlib', True),
+    ('lzma', 'lzma', False),
+]
+
+
+def synthetic_records(count, seed=1):
+    """Make `count` (key, text) records like those of the benchmark journals."""
+    rng = random.Random(seed)
+    words = vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return [(key_of(day), synthetic_entry(rng, words, weights)) for day in range(1, count + 1)]
+
+
+def corpus_records(directory):
+    """Read the (key, text) records of a directory of dated notes, the last of any one date winning."""
+    files, _ = importer.find_files(directory)
+    return sorted(dict(importer.read_files(files)).items())
+
+
+def measure(file_path, records, method, dictionary):
+    """Save `records` as a new journal compressed by `method`, then open it, returning
+    {measure: value}. The key derivation is timed apart and left out of both times."""
+    journal = core.Journal(file_path, PASSWORD, storage_format=storage.LogFormat)
+    journal.import_entries(records[:core.Journal.DICTIONARY_SAMPLES], save=False)
+    # the dictionary is trained on what the journal already holds, as `journal compress` does
+    journal.set_compression(method, dictionary, save=False)
+    # nothing is saved yet, so the journal is written once, without superseded records to count
+    start = time.perf_counter()
+    journal.import_entries(records, importer.IMPORT_REPLACE)
+    save = time.perf_counter() - start
+    start = time.perf_counter()
+    crypto.KeyContext(PASSWORD, journal.key.salt, journal.key.iterations)
+    kdf = time.perf_counter() - start
+    start = time.perf_counter()
+    core.Journal(file_path, PASSWORD)
+    opened = time.perf_counter() - start
+    return {'bytes': os.path.getsize(file_path), 'open s': opened - kdf, 'save s': save}
+
+
+def main():
+    """Run each variant and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--entries', type=int, default=10000, help='synthetic entries to generate')
+    parser.add_argument('--corpus', help='directory of dated notes to use instead')
+    args = parser.parse_args()
+    records = corpus_records(args.corpus) if args.corpus else synthetic_records(args.entries)
+    text_bytes = sum(len(text.encode('utf-8')) for _, text in records)
+    print(f'{len(records)} entries, {text_bytes / 2**20:.1f} MiB of text')
+    print(f'{"compression":<16} {"MiB":>8} {"of none":>8} {"open s":>8} {"save s":>8}')
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory:
+        for name, method, dictionary in VARIANTS:
+            result = measure(os.path.join(directory, f'{name}.journal'), records, method, dictionary)
+            baseline = baseline or result['bytes']
+            print(f'{name:<16} {result["bytes"] / 2**20:>8.2f} {result["bytes"] / baseline:>8.0%} '
+                  f'{result["open s"]:>8.3f} {result["save s"]:>8.3f}')
+
+
+if __name__ == '__main__':
+    main()
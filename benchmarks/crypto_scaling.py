@@ -0,0 +1,78 @@
+"""
+Measures how whole-journal encryption and decryption scale with the number
+of worker threads on a synthetic 50k-entry journal.
+
+Usage: python3 benchmarks/crypto_scaling.py [ENTRIES] [MAX_WORKERS]
+"""
+
+# crypto_scaling.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import sys
+import time
+import random
+import importlib.util
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+spec = importlib.util.spec_from_file_location('journal', os.path.join(SRC, '__init__.py'),
+                                              submodule_search_locations=[SRC])
+sys.modules['journal'] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sys.modules['journal'])
+
+# pylint: disable=wrong-import-position
+from journal import crypto
+
+WORDS = ('the quick brown fox jumps over lazy dog walked to work today rain sun '
+         'coffee meeting dinner read book slept well tired happy garden call').split()
+
+
+def synthetic_entries(count, seed=1):
+    """Generate `count` entries of a few hundred to a few thousand characters."""
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(WORDS, k=rng.randint(40, 600))) for _ in range(count)]
+
+
+def main():
+    """Run the benchmark and print a table of timings per worker count."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    key = crypto.KeyContext('benchmark', iterations=1000)  # the KDF is not under test
+    plaintexts = synthetic_entries(count)
+    dates = [f'{day:010}' for day in range(count)]
+    tokens = crypto.BatchCipher(key).encrypt_all(zip(dates, plaintexts))
+    print(f'{count} entries, {sum(len(text) for text in plaintexts) / 2**20:.1f} MiB of text')
+    print(f'{"workers":>8} {"encrypt s":>10} {"decrypt s":>10} {"speedup":>8}')
+    counts = sorted({2 ** i for i in range(max_workers.bit_length()) if 2 ** i < max_workers} | {max_workers})
+    baseline = None
+    for workers in counts:
+        cipher = crypto.BatchCipher(key, workers)
+        start = time.perf_counter()
+        cipher.encrypt_all(zip(dates, plaintexts))
+        encrypt_time = time.perf_counter() - start
+        start = time.perf_counter()
+        decrypted = cipher.decrypt_all(zip(dates, tokens))
+        decrypt_time = time.perf_counter() - start
+        assert decrypted == plaintexts
+        total = encrypt_time + decrypt_time
+        baseline = baseline or total
+        print(f'{workers:>8} {encrypt_time:>10.3f} {decrypt_time:>10.3f} {baseline / total:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Times the common Journal operations on synthetic journals of 1k, 10k and
+100k entries and writes the results as JSON, so runs on different commits
+can be compared.
+
+Usage: python3 benchmarks/journal_suite.py [--sizes 1000,10000,100000]
+           [--output results.json] [--compare baseline.json] [--cache DIR]
+"""
+
+# journal_suite.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import platform
+import statistics
+import subprocess
+import tempfile
+import importlib.util
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+spec = importlib.util.spec_from_file_location('journal', os.path.join(SRC, '__init__.py'),
+                                              submodule_search_locations=[SRC])
+sys.modules['journal'] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sys.modules['journal'])
+
+# pylint: disable=wrong-import-position
+from journal import core, crypto, search, storage
+
+PASSWORD = 'benchmark'
+START = datetime.date(1900, 1, 1)
+# entries generated and saved per batch, bounding memory while generating
+BATCH = 10000
+# timed repetitions of each per-operation benchmark
+SAMPLES = 200
+QUERIES = ['garden', 'coffee morning', '"walked to work"', 'rain*']
+
+
+def vocabulary(rng, size=5000):
+    """Make `size` pseudo-words, the first few being common English ones used in queries."""
+    words = ('the and to a i of it was in that we my with for on at walked work garden coffee '
+             'morning rain rained raining dinner read book slept well tired happy call').split()
+    letters = 'etaoinshrdlucmfwypvbgk'
+    while len(words) < size:
+        words.append(''.join(rng.choices(letters, k=rng.randint(2, 10))))
+    return words
+
+
+def synthetic_entry(rng, words, weights):
+    """Make an entry of a few paragraphs, with a long-tailed length of about 250 words
+    on average and word frequencies following Zipf's law."""
+    count = max(5, min(5000, int(rng.lognormvariate(5.3, 0.7))))
+    text = rng.choices(words, weights, k=count)
+    paragraphs = []
+    while text:
+        size = rng.randint(40, 120)
+        paragraphs.append(' '.join(text[:size]).capitalize() + '.')
+        text = text[size:]
+    return '\n\n'.join(paragraphs)
+
+
+def key_of(day):
+    """Get the key of the `day`th day from START."""
+    return (START + datetime.timedelta(days=day)).isoformat()
+
+
+def generate(file_path, size, seed=1):
+    """Write a log-format journal of `size` daily entries, with some days skipped."""
+    rng = random.Random(seed)
+    words = vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    journal = core.Journal(file_path, PASSWORD, lazy=True, storage_format=storage.LogFormat)
+    day = 0
+    for start in range(0, size, BATCH):
+        records = []
+        for _ in range(min(BATCH, size - start)):
+            day += 1 if rng.random() < 0.8 else rng.randint(2, 5)
+            records.append((key_of(day), synthetic_entry(rng, words, weights)))
+        journal.import_entries(records)
+
+
+def timed(function, samples=1):
+    """Run `function` `samples` times, returning the median seconds per call."""
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(file_path, size):
+    """Time each operation on the journal at `file_path`, returning {operation: seconds}."""
+    rng = random.Random(2)
+    results = {}
+    start = time.perf_counter()
+    journal = core.Journal(file_path, PASSWORD, lazy=True)
+    results['open'] = time.perf_counter() - start
+    results['open.kdf'] = timed(lambda: crypto.KeyContext(PASSWORD, journal.key.salt, journal.key.iterations))
+    keys = list(journal.get_keys())
+    first, last = datetime.date.fromisoformat(keys[0]), datetime.date.fromisoformat(keys[-1])
+    span = (last - first).days
+
+    cold = iter(rng.sample(keys, min(SAMPLES, len(keys))))
+    results['get_entry.cold'] = timed(lambda: journal.get_entry(next(cold)), min(SAMPLES, len(keys)))
+    warm = keys[-1]
+    results['get_entry.warm'] = timed(lambda: journal.get_entry(warm), SAMPLES)
+
+    edits = iter(rng.sample(keys, 50))
+    results['add_entry+save'] = timed(lambda: journal.add_entry(next(edits), 'Edited.\n\n' * 20), 50)
+
+    def random_key():
+        return (first + datetime.timedelta(days=rng.randint(0, span))).isoformat()
+    results['navigate.next'] = timed(lambda: journal.next(random_key()), SAMPLES)
+    results['navigate.prev'] = timed(lambda: journal.prev(random_key()), SAMPLES)
+    results['navigate.first+last'] = timed(lambda: (journal.first(), journal.last()), SAMPLES)
+
+    def random_month():
+        day = first + datetime.timedelta(days=rng.randint(0, span))
+        return day.year, day.month
+    results['month.days'] = timed(lambda: journal.get_days(*random_month()), SAMPLES)
+
+    def mark_all():
+        journal.months = {}
+        for key in journal.get_keys():
+            journal.mark_month(key)
+    results['month.index'] = timed(mark_all)
+
+    index = search.SearchIndex()
+    results['search.build'] = timed(lambda: index.build(journal.iter_entries()))
+    for query in QUERIES:
+        results[f'search.query {query}'] = timed(lambda query=query: index.search(query, 20), 20)
+    results['entries'] = size
+    return results
+
+
+def git_revision():
+    """Get the commit being measured, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SRC, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """Generate any missing journals, run the suite and report."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma-separated entry counts')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--cache', default=os.path.join(tempfile.gettempdir(), 'journal-benchmarks'),
+                        help='directory keeping the generated journals between runs')
+    args = parser.parse_args()
+    os.makedirs(args.cache, exist_ok=True)
+    report = {
+        'revision': git_revision(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'results': {},
+    }
+    for size in (int(size) for size in args.sizes.split(',')):
+        file_path = os.path.join(args.cache, f'{size}.journal')
+        if not os.path.exists(file_path):
+            print(f'generating {size} entries...', file=sys.stderr)
+            generate(file_path, size)
+        work_path = f'{file_path}.work'
+        # edits must not accumulate in the cached journal
+        with open(file_path, 'rb') as source, open(work_path, 'wb') as target:
+            target.write(source.read())
+        print(f'measuring {size} entries...', file=sys.stderr)
+        try:
+            report['results'][str(size)] = run(work_path, size)
+        finally:
+            os.remove(work_path)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'rt', encoding='UTF-8') as file:
+            baseline = json.load(file)['results']
+    for size, results in report['results'].items():
+        print(f'\n{size} entries', file=sys.stderr)
+        for operation, seconds in results.items():
+            if operation == 'entries':
+                continue
+            line = f'  {operation:<28} {seconds * 1e3:>12.3f} ms'
+            old = (baseline or {}).get(size, {}).get(operation)
+            if old:
+                line += f'  {seconds / old:>6.2f}x baseline'
+            print(line, file=sys.stderr)
+    if args.output:
+        with open(args.output, 'wt', encoding='UTF-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
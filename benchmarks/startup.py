@@ -0,0 +1,88 @@
+"""
+Measures launch speed: the cost of each module deferred until a journal is
+opened, each in a fresh interpreter, and, given a command that launches the
+application, the time from process start to first frame over several runs.
+
+Usage: python3 benchmarks/startup.py [--command journal] [--runs 5]
+"""
+
+# startup.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+MODULES = ['cryptography.fernet', 'jprops', 'sortedcontainers', 'journal.core', 'journal.search']
+MARK = re.compile(r'startup: (.+) at ([\d.]+) ms')
+
+# imports the src directory as the journal package, then times importing one module
+IMPORT_TIMER = '''
+import sys, time, importlib.util
+spec = importlib.util.spec_from_file_location('journal', sys.argv[1] + '/__init__.py',
+                                              submodule_search_locations=[sys.argv[1]])
+sys.modules['journal'] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sys.modules['journal'])
+start = time.perf_counter()
+importlib.import_module(sys.argv[2])
+print(time.perf_counter() - start)
+'''
+
+
+def import_time(module, runs):
+    """Get the median seconds to import `module` into a fresh interpreter."""
+    times = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', IMPORT_TIMER, SRC, module],
+                                capture_output=True, text=True, check=True)
+        times.append(float(result.stdout))
+    return statistics.median(times)
+
+
+def launch_times(command, runs):
+    """Launch the application `runs` times with JOURNAL_STARTUP=exit, returning
+    the median milliseconds to each startup milestone."""
+    marks = {}
+    env = dict(os.environ, JOURNAL_STARTUP='exit')
+    for _ in range(runs):
+        result = subprocess.run(command, shell=True, env=env, capture_output=True, text=True, timeout=60, check=False)
+        for name, milliseconds in MARK.findall(result.stderr):
+            marks.setdefault(name, []).append(float(milliseconds))
+    return {name: statistics.median(times) for name, times in marks.items()}
+
+
+def main():
+    """Run the measurements and print them as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--command', help='command launching the application, e.g. journal')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    report = {'deferred imports ms': {module: import_time(module, args.runs) * 1000 for module in MODULES}}
+    if args.command:
+        report['launch ms'] = launch_times(args.command, args.runs)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Bookkeeping for the decrypted entries kept in memory.
+"""
+
+# cache.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+from collections import OrderedDict
+
+
+class EntryCache:
+    """
+    A least-recently-used record of resident plaintexts, bounded by entry count,
+    total size in bytes, or both. A bound of None means unbounded.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        """Initialization."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (resident text, its size in bytes), least recently used first
+        self.resident = OrderedDict()
+        self.total_bytes = 0
+
+
+    def touch(self, key, text):
+        """Record `key` as most recently used with `text` resident, returning the keys
+        evicted to stay in budget. A text other than the one resident is measured again."""
+        resident = self.resident.get(key)
+        if resident is not None and resident[0] is text:
+            self.resident.move_to_end(key)
+            return []
+        size = len(text.encode('utf-8'))
+        if resident is not None:
+            del self.resident[key]
+            self.total_bytes -= resident[1]
+        self.resident[key] = (text, size)
+        self.total_bytes += size
+        evicted = []
+        while len(self.resident) > 1 and self.over_budget():
+            old_key, (_, old_size) = self.resident.popitem(last=False)
+            self.total_bytes -= old_size
+            evicted.append(old_key)
+        return evicted
+
+
+    def over_budget(self):
+        """Determine if either bound is exceeded."""
+        if self.max_entries is not None and len(self.resident) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+
+    def discard(self, key):
+        """Forget `key` if present."""
+        resident = self.resident.pop(key, None)
+        if resident is not None:
+            self.total_bytes -= resident[1]
+
+
+    def __contains__(self, key):
+        return key in self.resident
+
+
+    def __len__(self):
+        return len(self.resident)
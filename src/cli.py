@@ -0,0 +1,292 @@
+"""
+The command-line interface, for scripted access to a journal without GTK.
+"""
+
+# cli.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import sys
+import json
+import time
+import getpass
+import argparse
+import datetime
+from contextlib import contextmanager
+
+from cryptography.fernet import InvalidToken
+from .compression import METHODS
+from .crypto import ENGINES
+from .core import Journal
+from .importer import IMPORT_APPEND, IMPORT_REPLACE, IMPORT_SKIP, find_files, read_files, read_jsonl
+from .saver import atomic_writer
+from .storage import LogFormat
+
+COMMANDS = ('export', 'stats', 'cat', 'import', 'compress', 'convert')
+
+# entries decrypted per batch, which bounds the memory used by a pass over the journal
+CHUNK_SIZE = 256
+
+
+def write_jsonl(file, key, text):
+    """Write an entry as one JSON object per line."""
+    file.write(json.dumps({'date': key, 'text': text}, ensure_ascii=False))
+    file.write('\n')
+
+
+def write_markdown(file, key, text):
+    """Write an entry as a Markdown section headed by its date."""
+    file.write(f'## {key}\n\n{text.rstrip()}\n\n')
+
+
+def write_text(file, key, text):
+    """Write an entry as plain text under its underlined date."""
+    file.write(f'{key}\n{"=" * len(key)}\n{text.rstrip()}\n\n')
+
+
+WRITERS = {
+    'jsonl': write_jsonl,
+    'markdown': write_markdown,
+    'text': write_text,
+}
+
+
+def parse_date(value):
+    """Check that `value` is a %Y-%m-%d date, returning it unchanged."""
+    try:
+        datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD") from None
+    if len(value) != 10:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+    return value
+
+
+def parse_range(value):
+    """Parse DATE, DATE..DATE, DATE.. or ..DATE into a (first, last) tuple, None for an open end."""
+    if '..' not in value:
+        date = parse_date(value)
+        return date, date
+    first, last = value.split('..', 1)
+    return parse_date(first) if first else None, parse_date(last) if last else None
+
+
+def read_password(args):
+    """Read the password from the file descriptor given, or else from stdin,
+    prompting if stdin is a terminal. Only the first line is used."""
+    if args.password_fd is not None:
+        with os.fdopen(args.password_fd, 'rt', encoding='UTF-8', closefd=False) as file:
+            line = file.readline()
+    elif sys.stdin.isatty():
+        return getpass.getpass('Password: ')
+    else:
+        line = sys.stdin.readline()
+    return line.rstrip('\r\n')
+
+
+@contextmanager
+def open_output(file_path):
+    """Open `file_path` for writing, atomically so a failed export leaves no partial
+    file, or yield stdout if there is no path or it is '-'."""
+    if file_path is None or file_path == '-':
+        yield sys.stdout
+        sys.stdout.flush()
+    else:
+        with atomic_writer(file_path) as file:
+            yield file
+
+
+def export(journal, args):
+    """Write every entry, or those in the optional range, in the chosen format."""
+    write = WRITERS[args.format]
+    keys = journal.get_keys_between(args.since, args.until)
+    with open_output(args.output) as file:
+        for key, text in journal.iter_entries(keys, CHUNK_SIZE):
+            write(file, key, text)
+
+
+def cat(journal, args):
+    """Write the entries within the range, as plain text by default."""
+    first, last = args.range
+    write = WRITERS[args.format]
+    with open_output(args.output) as file:
+        for key, text in journal.iter_entries(journal.get_keys_between(first, last), CHUNK_SIZE):
+            write(file, key, text)
+
+
+def stats(journal, args):
+    """Write counts of entries, words and characters, in one pass over the journal."""
+    entries = words = characters = 0
+    longest = None
+    longest_words = 0
+    for key, text in journal.iter_entries(chunk_size=CHUNK_SIZE):
+        entry_words = len(text.split())
+        entries += 1
+        words += entry_words
+        characters += len(text)
+        if entry_words > longest_words:
+            longest, longest_words = key, entry_words
+    result = {
+        'entries': entries,
+        'first': journal.first(),
+        'last': journal.last(),
+        'words': words,
+        'characters': characters,
+        'mean_words': round(words / entries, 1) if entries else 0,
+        'longest': longest,
+        'longest_words': longest_words,
+    }
+    with open_output(args.output) as file:
+        if args.format == 'jsonl':
+            file.write(json.dumps(result) + '\n')
+        else:
+            for name, value in result.items():
+                file.write(f'{name}: {"" if value is None else value}\n')
+
+
+def import_entries(journal, args):
+    """Merge a directory of notes or a JSON Lines file into the journal and save it once."""
+    start = time.perf_counter()
+    if os.path.isdir(args.source):
+        files, undated = find_files(args.source)
+        for path in undated:
+            print(f'journal: no date in the name of {path}, skipped', file=sys.stderr)
+        records = read_files(files, stage_progress('reading files'))
+    else:
+        records = read_jsonl(args.source, args.date_field, args.text_field, stage_progress('reading'))
+    counts = journal.import_entries(records, args.policy, stage_progress('encrypting'))
+    elapsed = time.perf_counter() - start
+    imported = counts['added'] + counts['replaced'] + counts['appended']
+    print(', '.join(f'{count} {name}' for name, count in counts.items())
+          + f' in {elapsed:.2f} s, {imported / elapsed if elapsed else 0:.0f} entries/s', file=sys.stderr)
+
+
+def compress(journal, args):
+    """Set how entries are compressed and rewrite them all that way, reporting the change in size."""
+    start = time.perf_counter()
+    size = os.path.getsize(journal.file_path)
+    method = None if args.method == 'none' else args.method
+    journal.set_compression(method, not args.no_dictionary, save=False)
+    journal.rewrite(progress=stage_progress('compressing'))
+    elapsed = time.perf_counter() - start
+    new_size = os.path.getsize(journal.file_path)
+    print(f'{size} bytes to {new_size} bytes, {new_size / size if size else 1:.0%}, in {elapsed:.2f} s',
+          file=sys.stderr)
+
+
+def convert(journal, args):
+    """Re-encrypt every entry with another cipher engine, reporting the change in size."""
+    start = time.perf_counter()
+    size = os.path.getsize(journal.file_path)
+    journal.rewrite(journal.key.with_cipher(args.cipher), stage_progress('encrypting'))
+    elapsed = time.perf_counter() - start
+    new_size = os.path.getsize(journal.file_path)
+    print(f'{size} bytes to {new_size} bytes, {new_size / size if size else 1:.0%}, in {elapsed:.2f} s',
+          file=sys.stderr)
+
+
+def stage_progress(stage):
+    """Make a progress(done, total) callback reporting `stage` on stderr,
+    or None if stderr is not a terminal."""
+    if not sys.stderr.isatty():
+        return None
+    def progress(done, total):
+        end = '\n' if done == total else ''
+        print(f'\r{stage}: {done * 100 // total if total else 100}%', end=end, file=sys.stderr, flush=True)
+    return progress
+
+
+def make_parser():
+    """Make the argument parser."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('journal', help='path of the journal file')
+    common.add_argument('-o', '--output', help="file to write, or '-' for stdout (the default)")
+    common.add_argument('--password-fd', type=int, metavar='FD',
+                        help='read the password from this file descriptor instead of stdin')
+    formats = list(WRITERS)
+
+    parser = argparse.ArgumentParser(prog='journal', description='Work with an encrypted journal without the GUI.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', parents=[common], help='write all entries')
+    export_parser.add_argument('-f', '--format', choices=formats, default='jsonl')
+    export_parser.add_argument('--since', type=parse_date, metavar='DATE', help='first date to export')
+    export_parser.add_argument('--until', type=parse_date, metavar='DATE', help='last date to export')
+    export_parser.set_defaults(handler=export)
+
+    stats_parser = commands.add_parser('stats', parents=[common], help='count entries and words')
+    stats_parser.add_argument('-f', '--format', choices=['jsonl', 'text'], default='text')
+    stats_parser.set_defaults(handler=stats)
+
+    cat_parser = commands.add_parser('cat', parents=[common], help='write the entries of a date range')
+    cat_parser.add_argument('range', type=parse_range, metavar='DATE..DATE',
+                            help='a date, or an inclusive range with either end optional')
+    cat_parser.add_argument('-f', '--format', choices=formats, default='text')
+    cat_parser.set_defaults(handler=cat)
+
+    import_parser = commands.add_parser('import', parents=[common],
+                                        help='add entries from a directory of notes or a JSON Lines file')
+    import_parser.add_argument('source', help='a directory of dated .txt/.md files, or a JSON Lines file')
+    import_parser.add_argument('--policy', choices=[IMPORT_SKIP, IMPORT_REPLACE, IMPORT_APPEND], default=IMPORT_SKIP,
+                               help='what to do with a date that already has an entry (default: skip)')
+    import_parser.add_argument('--date-field', default='date', help="JSON field holding the date (default: date)")
+    import_parser.add_argument('--text-field', default='text', help="JSON field holding the text (default: text)")
+    import_parser.set_defaults(handler=import_entries, writes=True)
+
+    compress_parser = commands.add_parser('compress', parents=[common],
+                                          help='compress every entry, or stop compressing new ones')
+    compress_parser.add_argument('--method', choices=list(METHODS) + ['none'], default=METHODS[0],
+                                 help='how entries are compressed from now on (default: zlib)')
+    compress_parser.add_argument('--no-dictionary', action='store_true',
+                                 help='do not train a zlib dictionary on the journal')
+    compress_parser.set_defaults(handler=compress, writes=True)
+
+    convert_parser = commands.add_parser('convert', parents=[common], help='re-encrypt every entry with another cipher')
+    convert_parser.add_argument('--cipher', choices=list(ENGINES), required=True)
+    convert_parser.set_defaults(handler=convert, writes=True)
+    return parser
+
+
+def main(argv=None):
+    """The command-line entry point, returning the exit status."""
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if not os.path.isfile(args.journal):
+        parser.error(f"no journal at '{args.journal}'")
+    if getattr(args, 'source', None) is not None and not os.path.exists(args.source):
+        parser.error(f"no such file or directory '{args.source}'")
+    password = read_password(args)
+    writes = getattr(args, 'writes', False)
+    try:
+        journal = Journal(args.journal, password, lazy=True, storage_format=LogFormat, read_only=not writes)
+        args.handler(journal, args)
+    except InvalidToken:
+        print('journal: the password is not correct', file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # the reader went away, e.g. piped into head
+        sys.stderr.close()
+        return 1
+    except OSError as ex:
+        print(f'journal: {ex}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Compression of entries before they are encrypted.
+"""
+
+# compression.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import re
+import lzma
+import zlib
+from collections import Counter
+
+# methods a journal may compress its entries with
+ZLIB = 'zlib'
+LZMA = 'lzma'
+METHODS = (ZLIB, LZMA)
+
+# a compressed plaintext starts with this byte, which never starts UTF-8 text,
+# so entries written without compression still read as they are; the next
+# byte tells how the rest is compressed
+FLAG = b'\xff'
+ZLIB_RAW = b'z'
+ZLIB_DICTIONARY = b'd'
+LZMA_RAW = b'x'
+# the preset's 8 MiB window takes longer to set up than a typical entry takes
+# to compress, and entries seldom exceed 1 MiB
+LZMA_FILTERS = [{'id': lzma.FILTER_LZMA2, 'preset': 6, 'dict_size': 1 << 20}]
+
+# entries of fewer bytes are stored as they are, compression would not pay
+THRESHOLD = 128
+# deflate only looks 32 KiB back, so a larger dictionary is never used
+DICTIONARY_SIZE = 32 * 1024
+# the words and runs of up to this many words counted when training a dictionary
+DICTIONARY_NGRAMS = 3
+WORD = re.compile(r'\S+\s+')
+
+
+class Compressor:
+    """
+    Compresses entry plaintexts with `method`, one of METHODS or None for no
+    compression, and `dictionary`, preset bytes for zlib. Whatever the method,
+    anything written by an earlier compressor with the same dictionary is
+    decompressed, so a journal may hold a mix.
+    """
+
+    def __init__(self, method=None, dictionary=None, threshold=THRESHOLD):
+        """Initialization."""
+        if method not in METHODS + (None,):
+            raise ValueError(f"Unknown compression '{method}'.")
+        self.method = method
+        self.dictionary = dictionary or None
+        self.threshold = threshold
+        # loading a dictionary costs more than compressing a typical entry,
+        # so it is loaded once and each entry compressed by a copy
+        self.primed = None
+        if self.dictionary is not None:
+            self.primed = zlib.compressobj(wbits=-15, zdict=self.dictionary)
+
+
+    def compress(self, data):
+        """Get the bytes to encrypt for the plaintext `data`, compressed if that makes them smaller."""
+        if self.method is None or len(data) < self.threshold:
+            return data
+        if self.method == LZMA:
+            packed = FLAG + LZMA_RAW + lzma.compress(data, lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+        elif self.primed is not None:
+            compressor = self.primed.copy()
+            packed = FLAG + ZLIB_DICTIONARY + compressor.compress(data) + compressor.flush()
+        else:
+            packed = FLAG + ZLIB_RAW + zlib.compress(data, wbits=-15)
+        return packed if len(packed) < len(data) else data
+
+
+    def decompress(self, data):
+        """Get the plaintext of decrypted bytes `data`, which may or may not be compressed."""
+        if not data.startswith(FLAG):
+            return data
+        kind = data[1:2]
+        if kind == ZLIB_RAW:
+            return zlib.decompress(data[2:], wbits=-15)
+        if kind == ZLIB_DICTIONARY:
+            if self.dictionary is None:
+                raise ValueError("Entry needs the journal's compression dictionary.")
+            decompressor = zlib.decompressobj(wbits=-15, zdict=self.dictionary)
+            return decompressor.decompress(data[2:]) + decompressor.flush()
+        if kind == LZMA_RAW:
+            return lzma.decompress(data[2:], lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+        raise ValueError("Entry is compressed in an unknown way.")
+
+
+def train_dictionary(texts, size=DICTIONARY_SIZE):
+    """Build a zlib preset dictionary of about `size` bytes from sample `texts`,
+    made of the words and short phrases that would save the most bytes,
+    the most valuable last where deflate reaches them most cheaply."""
+    counts = Counter()
+    for text in texts:
+        words = WORD.findall(text)
+        for n in range(1, DICTIONARY_NGRAMS + 1):
+            counts.update(''.join(words[i:i + n]) for i in range(len(words) - n + 1))
+    # a string seen once is no help to later entries
+    scored = sorted(((count * len(string), string) for string, count in counts.items() if count > 1),
+                    reverse=True)
+    chosen = []
+    total = 0
+    for _, string in scored:
+        data = string.encode('utf-8')
+        if total + len(data) > size:
+            break
+        chosen.append(data)
+        total += len(data)
+    return b''.join(reversed(chosen))
@@ -0,0 +1,675 @@
+"""
+The journal itself: its entries, their encryption and storage, free of any UI.
+"""
+
+# core.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import hmac
+import base64
+import hashlib
+import datetime
+import threading
+
+from cryptography.fernet import InvalidToken
+from sortedcontainers import SortedDict
+from .cache import EntryCache
+from .compression import ZLIB, Compressor, train_dictionary
+from .crypto import DEFAULT_CIPHER, KDF_ITERATIONS, LEGACY_CIPHER, BatchCipher, KeyContext
+from .importer import IMPORT_APPEND, IMPORT_REPLACE, IMPORT_SKIP
+from .saver import file_mode, sync_directory
+from .storage import Cancelled, ContainerFormat, PropertiesFormat, read_header, read_journal
+from .tracing import count, traced
+
+
+class Journal:
+    """
+    A map where the keys are dates in the format %Y-%m-%d and
+    the values are encrypted textual entries.
+    """
+
+    # header properties
+    HEADER_SALT = 'journal.salt'
+    HEADER_ITERATIONS = 'journal.iterations'
+    HEADER_CHECK = 'journal.check'
+    HEADER_CIPHER = 'journal.cipher'
+    HEADER_COMPRESSION = 'journal.compression'
+    HEADER_DICTIONARY = 'journal.dictionary'
+
+    # default bounds on resident plaintexts in lazy mode
+    CACHE_ENTRIES = 64
+    CACHE_BYTES = 4 * 1024 * 1024
+
+    # most recent entries a compression dictionary is trained on
+    DICTIONARY_SAMPLES = 2000
+
+    @traced('journal.open')
+    def __init__(self, file_path, password, lazy=False, cache_entries=None, cache_bytes=None, workers=None,
+                 storage_format=ContainerFormat, read_only=False, progress=None, cancelled=None,
+                 cipher=DEFAULT_CIPHER):
+        """Initialization. In `lazy` mode entries are decrypted on demand and only
+        the most recently used are kept, within `cache_entries` and `cache_bytes`.
+        Whole-journal encryption and decryption is spread over `workers` threads.
+        New and .properties journals are written in `storage_format`, while
+        container and log journals keep their format. A `read_only` journal
+        leaves its file as it is. A wrong password raises InvalidToken, where
+        possible before the file is read. `progress(done, total)` is called as
+        the file is read and `cancelled()` is polled, raising Cancelled if it
+        returns True. New journals, and those predating the header, are encrypted
+        with the engine named `cipher`; others keep the one their header names."""
+        self.file_path = file_path
+        self.workers = workers
+        # guards entry state shared with a background save
+        self.lock = threading.RLock()
+        # serializes saves
+        self.save_lock = threading.Lock()
+        # callables taking (key, text) when an entry changes, text None if removed
+        self.listeners = []
+        # callables taking the list of keys written by each save
+        self.save_listeners = []
+        if lazy:
+            self.cache = EntryCache(cache_entries or self.CACHE_ENTRIES, cache_bytes or self.CACHE_BYTES)
+        else:
+            self.cache = EntryCache(cache_entries, cache_bytes)
+        # check the password against the header's key check before reading entries
+        self.key = None
+        header = read_header(file_path)
+        if header:
+            self.key = self.open_key(password, header)
+        # load entries if any, in whichever format the file is
+        journal_format, header, encrypted = read_journal(file_path, progress, cancelled)
+        if journal_format is None or isinstance(journal_format, PropertiesFormat):
+            self.format = storage_format()
+        else:
+            self.format = journal_format
+        # ciphertext of each entry as last written, reused until its text changes
+        self.ciphertexts = encrypted
+        # keys whose ciphertext is stale, either changed or removed
+        self.dirty = set()
+        # the version of the file as last read or written, see reload
+        self.signature = None
+        # keys taken from changes made to the file elsewhere, and {key: text elsewhere} of the
+        # unsaved entries they conflicted with, since last reported by reload
+        self.merged = set()
+        self.conflicts = {}
+        # values are None for entries not currently decrypted
+        self.entries = SortedDict.fromkeys(encrypted.keys())
+        # bitmask of the days having an entry, by (year, month)
+        self.months = {}
+        for key in self.entries.keys():
+            self.mark_month(key)
+        if header:
+            if self.key is None:
+                self.key = self.open_key(password, header)
+            if not lazy:
+                texts = self.batch_cipher().decrypt_all(encrypted.items())
+                for key, text in zip(encrypted.keys(), texts):
+                    self.cache_entry(key, text)
+            elif len(encrypted) > 0 and self.HEADER_CHECK not in header:
+                # no key check yet, so decrypt one entry to have a wrong password fail here
+                key = encrypted.keys()[-1]
+                self.load_entry(key, encrypted[key])
+            if isinstance(journal_format, PropertiesFormat) and not read_only:
+                # migrate a .properties journal once, reusing its ciphertexts
+                self.format.write(self.file_path, header, list(encrypted.items()))
+        elif len(encrypted) > 0:
+            # journal predates the header, decrypt with the old fixed salt and
+            # re-key with fresh parameters, applied on next save
+            legacy_cipher = BatchCipher(KeyContext.legacy(password), self.workers)
+            texts = legacy_cipher.decrypt_all(encrypted.items())
+            self.entries.update(zip(encrypted.keys(), texts))
+            self.dirty.update(self.entries.keys())
+            self.key = KeyContext(password, cipher=cipher)
+        else:
+            self.key = KeyContext(password, cipher=cipher)
+        self.signature = self.file_signature()
+
+
+    def open_key(self, password, header):
+        """Derive the key described by `header` for `password`, raising InvalidToken
+        if the header has a key check that the key does not match."""
+        key = KeyContext(password, base64.b64decode(header[self.HEADER_SALT]), int(header[self.HEADER_ITERATIONS]),
+                         header.get(self.HEADER_CIPHER, LEGACY_CIPHER))
+        check = header.get(self.HEADER_CHECK)
+        if check is not None and not hmac.compare_digest(check, key.check):
+            raise InvalidToken
+        dictionary_token = header.get(self.HEADER_DICTIONARY)
+        dictionary = None if dictionary_token is None else key.decrypt_header(dictionary_token)
+        key.set_compressor(Compressor(header.get(self.HEADER_COMPRESSION), dictionary), dictionary_token)
+        return key
+
+
+    def get_header(self, key=None):
+        """Get the header properties describing how the key, or `key`, is derived,
+        the check that tells whether a password is right and how entries are
+        encrypted and compressed."""
+        key = key or self.key
+        header = {
+            self.HEADER_SALT: base64.b64encode(key.salt).decode('ascii'),
+            self.HEADER_ITERATIONS: str(key.iterations),
+            self.HEADER_CHECK: key.check,
+        }
+        # journals without one are Fernet, so their header need not change
+        if key.engine.NAME != LEGACY_CIPHER:
+            header[self.HEADER_CIPHER] = key.engine.NAME
+        if key.compressor.method is not None:
+            header[self.HEADER_COMPRESSION] = key.compressor.method
+        if key.dictionary_token is not None:
+            header[self.HEADER_DICTIONARY] = key.dictionary_token
+        return header
+
+
+    def set_compression(self, method, dictionary=True, save=True):
+        """Compress entries saved from now on with `method`, one of compression.METHODS,
+        or None to stop compressing. With `dictionary`, zlib uses a dictionary trained on
+        the most recent entries if the journal has none yet; once made it is kept, as the
+        entries compressed with it need it. Entries already saved are compressed when next
+        saved, or all at once by `rewrite`."""
+        with self.save_lock:
+            trained = self.key.compressor.dictionary
+            if method == ZLIB and dictionary and trained is None:
+                keys = list(self.get_keys()[-self.DICTIONARY_SAMPLES:])
+                trained = train_dictionary(text for _, text in self.iter_entries(keys))
+            with self.lock:
+                self.key.set_compressor(Compressor(method, trained))
+        if save and len(self.get_keys()) > 0:
+            self.save()
+
+
+    @traced('journal.save')
+    def save(self, progress=None):
+        """Save all entries to file, encrypting only those changed since the last save.
+        Safe to call from a worker thread while the main thread keeps editing.
+        `progress(done, total)` is called as the changed entries are encrypted.
+        Changes made to the file elsewhere are merged in first, as `reload` does, so
+        they are kept; unsaved entries they conflict with are saved over them."""
+        with self.save_lock:
+            merged = self.merge_file()
+            with self.lock:
+                self.prune_empty_values()
+                if len(self.get_keys()) == 0:
+                    raise Exception("Empty journal not saved.")
+                # text of each dirty key as of now, None if removed
+                snapshot = {key: self.entries.get(key) for key in self.dirty}
+            changed = [key for key, text in snapshot.items() if text is not None]
+            tokens = self.batch_cipher().encrypt_all(((key, snapshot[key]) for key in changed), progress)
+            with self.lock:
+                self.ciphertexts.update(zip(changed, tokens))
+                for key, text in snapshot.items():
+                    if text is None:
+                        self.ciphertexts.pop(key, None)
+                header = self.get_header()
+                changes = [(key, self.ciphertexts.get(key)) for key in snapshot]
+            self.format.save(self.file_path, header, changes, self.get_ciphertexts)
+            self.signature = self.file_signature()
+            with self.lock:
+                # entries not edited again meanwhile are clean and may now be evicted
+                for key, text in snapshot.items():
+                    if self.entries.get(key) == text:
+                        self.dirty.discard(key)
+                        if text is not None:
+                            self.cache_entry(key, text)
+        # told after the lock is released, so what they write never holds up the next save
+        for listener in self.save_listeners:
+            listener(merged + list(snapshot))
+
+
+    @traced('journal.change_password')
+    def change_password(self, old_password, new_password, iterations=KDF_ITERATIONS, progress=None,
+                        cancelled=None, chunk_size=1024, cipher=None):
+        """Re-encrypt the journal under `new_password` with a fresh salt and `iterations`,
+        and with the engine named `cipher` or else the current one, as `rewrite` does.
+        Returns True once the journal is re-keyed, or False if cancelled."""
+        if not self.key.matches(old_password):
+            raise ValueError("The current password is not correct.")
+        new_key = KeyContext(new_password, iterations=iterations, cipher=cipher or self.key.engine.NAME)
+        new_key.set_compressor(self.key.compressor)
+        return self.rewrite(new_key, progress, cancelled, chunk_size)
+
+
+    @traced('journal.rewrite')
+    def rewrite(self, new_key=None, progress=None, cancelled=None, chunk_size=1024):
+        """Re-encrypt every entry with `new_key`, or this journal's key, e.g. to compress them all
+        or to change the cipher with `KeyContext.with_cipher`.
+        Entries are streamed in chunks through decrypt and encrypt into a temporary
+        file, which is read back and checked in full before it replaces the journal,
+        so any failure leaves the journal as it was. Unsaved changes are included.
+        `progress(done, total)` is called as chunks are written and checked, and
+        `cancelled()` before each chunk; if it returns True the journal is left
+        unchanged and False is returned. Returns True once the journal is rewritten."""
+        new_key = new_key or self.key
+        new_cipher = BatchCipher(new_key, self.workers)
+        header = self.get_header(new_key)
+        # beside the file a symlinked journal links to, so the link is kept
+        target = os.path.realpath(self.file_path)
+        temp_path = f'{target}.rekey'
+        with self.save_lock:
+            merged = self.merge_file()
+            with self.lock:
+                self.prune_empty_values()
+                keys = list(self.entries.keys())
+                # unsaved texts as of now, written in place of their stale ciphertexts
+                snapshot = {key: self.entries[key] for key in self.dirty if key in self.entries}
+            total = 2 * len(keys)
+            # digest of each plaintext written, to check the temporary file against
+            digests = {}
+
+            def check_cancelled():
+                if cancelled is not None and cancelled():
+                    raise Cancelled()
+
+            def reencrypted():
+                for start in range(0, len(keys), chunk_size):
+                    check_cancelled()
+                    chunk = keys[start:start + chunk_size]
+                    with self.lock:
+                        texts = [snapshot.get(key, self.entries.get(key)) for key in chunk]
+                        ciphertexts = [(key, self.ciphertexts[key]) for key, text in zip(chunk, texts) if text is None]
+                    decrypted = iter(self.batch_cipher().decrypt_all(ciphertexts))
+                    texts = [next(decrypted) if text is None else text for text in texts]
+                    for key, text, token in zip(chunk, texts, new_cipher.encrypt_all(zip(chunk, texts))):
+                        digests[key] = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+                        yield key, token
+                    if progress is not None:
+                        progress(start + len(chunk), total)
+
+            try:
+                type(self.format)().write(temp_path, header, reencrypted())
+                # read back and decrypt everything before trusting the new file
+                _, written_header, written = read_journal(temp_path)
+                if written_header != header or list(written.keys()) != keys:
+                    raise Exception("Re-encrypted journal failed verification.")
+                for start in range(0, len(keys), chunk_size):
+                    check_cancelled()
+                    chunk = keys[start:start + chunk_size]
+                    for key, text in zip(chunk, new_cipher.decrypt_all((key, written[key]) for key in chunk)):
+                        if hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() != digests[key]:
+                            raise Exception("Re-encrypted journal failed verification.")
+                    if progress is not None:
+                        progress(len(keys) + start + len(chunk), total)
+            except BaseException as ex:
+                try:
+                    os.remove(temp_path)
+                except FileNotFoundError:
+                    pass
+                if isinstance(ex, Cancelled):
+                    return False
+                raise
+            os.chmod(temp_path, file_mode(target))
+            os.replace(temp_path, target)
+            sync_directory(target)
+            self.signature = self.file_signature()
+            with self.lock:
+                self.format, _, self.ciphertexts = read_journal(self.file_path)
+                self.key = new_key
+                # entries not edited again meanwhile are now saved
+                for key, text in snapshot.items():
+                    if self.entries.get(key) == text:
+                        self.dirty.discard(key)
+                        self.cache_entry(key, text)
+        for listener in self.save_listeners:
+            listener(sorted(set(keys) | set(merged)))
+        return True
+
+
+    @traced('journal.reload')
+    def reload(self, password):
+        """Merge in the entries another program, e.g. a file sync, changed in the file since
+        it was last read or written here. Entries are compared by ciphertext and only those
+        that differ are decrypted. An entry with unsaved changes is left as it is, and
+        overwrites the file's on the next save, unless the other program made it the same.
+        A file re-keyed elsewhere is opened with `password`, raising InvalidToken if that
+        no longer matches. Returns (keys taken from the file, {key: text in the file,
+        None if removed} of the unsaved entries it conflicts with), including those merged
+        by saves since the last reload, both empty if there were none. The listeners are
+        told of each entry taken, and the save listeners of the keys taken, as those are
+        now as saved."""
+        with self.save_lock:
+            merged = self.merge_file(password)
+            with self.lock:
+                reported = sorted(self.merged), self.conflicts
+                self.merged = set()
+                self.conflicts = {}
+        if merged:
+            for listener in self.save_listeners:
+                listener(merged)
+        return reported
+
+
+    def merge_file(self, password=None):
+        """Merge in the changes made to the file elsewhere, if any, returning the keys taken
+        and keeping them and the conflicts for `reload` to report. The caller holds the save
+        lock. A file re-keyed elsewhere needs `password`, without which ValueError is raised."""
+        signature = self.file_signature()
+        if signature is None or signature == self.signature:
+            return []
+        journal_format, header, ciphertexts = read_journal(self.file_path)
+        if journal_format is None:
+            # emptied, e.g. mid-sync; the next save writes it again
+            return []
+        if not header:
+            raise ValueError("Journal file was replaced by one without a header.")
+        key = self.key
+        if header != self.get_header():
+            if password is None:
+                raise ValueError("Journal was re-encrypted elsewhere. Reopen it to save.")
+            key = self.open_key(password, header)
+        # saves hold the save lock, so self.ciphertexts is stable here
+        if key is self.key:
+            changed = [date for date in set(ciphertexts.keys()) | set(self.ciphertexts.keys())
+                       if ciphertexts.get(date) != self.ciphertexts.get(date)]
+        else:
+            changed = list(set(ciphertexts.keys()) | set(self.ciphertexts.keys()))
+        present = sorted(date for date in changed if date in ciphertexts)
+        texts = dict(zip(present, BatchCipher(key, self.workers).decrypt_all(
+            (date, ciphertexts[date]) for date in present)))
+        merged = []
+        with self.lock:
+            # a log's state is that of the file as now read; a .properties file is rewritten
+            self.format = type(self.format)() if isinstance(journal_format, PropertiesFormat) else journal_format
+            self.ciphertexts = ciphertexts
+            self.key = key
+            for date in sorted(changed):
+                text = texts.get(date)
+                if date in self.dirty:
+                    if self.entries.get(date) != text:
+                        self.conflicts[date] = text
+                        self.merged.discard(date)
+                    continue
+                merged.append(date)
+                self.merged.add(date)
+                self.conflicts.pop(date, None)
+                if text is not None:
+                    self.cache_entry(date, text)
+                    self.mark_month(date)
+                    self.notify(date, text)
+                elif date in self.entries:
+                    self.entries.pop(date)
+                    self.unmark_month(date)
+                    self.cache.discard(date)
+                    self.notify(date, None)
+            self.signature = signature
+        count('journal.reload.merged', len(merged))
+        return merged
+
+
+    def file_signature(self):
+        """Get what identifies the version of the file on disk, or None if there is none."""
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+    def get_ciphertexts(self):
+        """Get a list of every (key, ciphertext) as of now."""
+        with self.lock:
+            return list(self.ciphertexts.items())
+
+
+    def prune_empty_values(self):
+        """Remove from self.entries those that have a blank value. Only changed
+        entries can have become blank, so only the dirty keys are checked."""
+        with self.lock:
+            keys_to_pop = [key for key in self.dirty if self.entries.get(key) == '']
+            for key in keys_to_pop:
+                self.entries.pop(key)
+                self.unmark_month(key)
+                self.cache.discard(key)
+                self.dirty.add(key)
+                self.notify(key, None)
+
+
+    def add_entry(self, date, text, save=True):
+        """Add a new entry, saving the journal unless `save` is False.
+        A blank entry removes the date."""
+        date_str = self.key_of(date)
+        with self.lock:
+            if text == '':
+                if date_str in self.entries:
+                    self.remove_entry(date_str)
+            elif date_str not in self.entries or self.get_entry(date_str) != text:
+                self.entries[date_str] = text
+                self.mark_month(date_str)
+                self.dirty.add(date_str)
+                # pin the unsaved plaintext until it is encrypted
+                self.cache.discard(date_str)
+                self.notify(date_str, text)
+        if save:
+            self.save()
+
+
+    @traced('journal.import_entries')
+    def import_entries(self, records, policy=IMPORT_SKIP, progress=None, save=True):
+        """Merge each (key, text) of `records` into the journal, then save once, encrypting
+        all of them in one batch, unless `save` is False. Several texts for one date are
+        joined in order. Where a date already has an entry, `policy` decides: IMPORT_SKIP
+        keeps it, IMPORT_REPLACE replaces it and IMPORT_APPEND adds the import after it.
+        `progress` is passed to `save`. Returns a dict of the number of dates
+        'added', 'replaced', 'appended' and 'skipped'."""
+        if policy not in (IMPORT_SKIP, IMPORT_REPLACE, IMPORT_APPEND):
+            raise ValueError(f"Unknown import policy '{policy}'.")
+        imported = {}
+        for key, text in records:
+            key = self.key_of(key)
+            text = text.strip()
+            if text != '':
+                imported[key] = f'{imported[key]}\n\n{text}' if key in imported else text
+        counts = dict.fromkeys(('added', 'replaced', 'appended', 'skipped'), 0)
+        with self.lock:
+            conflicts = [key for key in imported if key in self.entries]
+        if policy == IMPORT_APPEND:
+            for key, text in self.iter_entries(conflicts):
+                imported[key] = f'{text.rstrip()}\n\n{imported[key]}'
+        with self.lock:
+            for key, text in imported.items():
+                if key not in self.entries:
+                    counts['added'] += 1
+                elif policy == IMPORT_SKIP:
+                    counts['skipped'] += 1
+                    continue
+                else:
+                    counts['replaced' if policy == IMPORT_REPLACE else 'appended'] += 1
+                self.entries[key] = text
+                self.mark_month(key)
+                self.dirty.add(key)
+                self.cache.discard(key)
+                self.notify(key, text)
+        if save and self.dirty:
+            self.save(progress)
+        return counts
+
+
+    def get_keys(self):
+        """Get all the dates in this journal."""
+        return self.entries.keys()
+
+
+    def get_keys_between(self, first=None, last=None):
+        """Get the dates from `first` to `last` inclusive, either bound being optional."""
+        with self.lock:
+            return list(self.entries.irange(first and self.key_of(first), last and self.key_of(last)))
+
+
+    def get_entry(self, key):
+        """Get a date's entry.'"""
+        key = self.key_of(key)
+        with self.lock:
+            text = self.entries[key]
+            if text is None:
+                count('cache.miss')
+                return self.load_entry(key, self.ciphertexts[key])
+            if key not in self.dirty:
+                self.cache.touch(key, text)
+            return text
+
+
+    def get_entries(self):
+        """Get all entries in this journal, decrypting each as it is reached."""
+        return ((key, self.get_entry(key)) for key in list(self.entries.keys()))
+
+
+    def iter_entries(self, keys=None, chunk_size=1024):
+        """Yield each (key, text) in date order, or of just `keys`, decrypting in batches
+        without disturbing the cache. Safe to run on a worker thread while editing."""
+        with self.lock:
+            keys = list(self.entries.keys()) if keys is None else sorted(keys)
+        for start in range(0, len(keys), chunk_size):
+            with self.lock:
+                chunk = [key for key in keys[start:start + chunk_size] if key in self.entries]
+                texts = [self.entries[key] for key in chunk]
+                ciphertexts = [(key, self.ciphertexts[key]) for key, text in zip(chunk, texts) if text is None]
+            decrypted = iter(self.batch_cipher().decrypt_all(ciphertexts))
+            for key, text in zip(chunk, texts):
+                yield key, next(decrypted) if text is None else text
+
+
+    def get_fingerprints(self, keys=None):
+        """Get {key: fingerprint} of the saved ciphertext of all entries, or of `keys`,
+        identifying the exact version of each entry on disk."""
+        with self.lock:
+            if keys is None:
+                keys = self.ciphertexts.keys()
+            return {key: hashlib.blake2b(self.ciphertexts[key], digest_size=12).hexdigest()
+                    for key in keys if key in self.ciphertexts}
+
+
+    def load_entry(self, key, ciphertext):
+        """Decrypt an entry into memory and return its text."""
+        text = self.decrypt(key, ciphertext)
+        self.cache_entry(key, text)
+        return text
+
+
+    def cache_entry(self, key, text):
+        """Keep a clean plaintext resident, dropping the least recently used if over budget."""
+        self.entries[key] = text
+        for evicted in self.cache.touch(key, text):
+            count('cache.eviction')
+            self.entries[evicted] = None
+
+
+    def remove_entry(self, key):
+        """Remove an entry."""
+        key = self.key_of(key)
+        with self.lock:
+            self.entries.pop(key)
+            self.unmark_month(key)
+            self.cache.discard(key)
+            self.dirty.add(key)
+            self.notify(key, None)
+
+
+    def add_listener(self, listener):
+        """Call `listener(key, text)` whenever an entry is added, changed or removed."""
+        self.listeners.append(listener)
+
+
+    def add_save_listener(self, listener):
+        """Call `listener(keys)` with the keys written after each save, on the saving thread
+        once the save is done, so the next save may already be running."""
+        self.save_listeners.append(listener)
+
+
+    def notify(self, key, text):
+        """Tell the listeners about a changed entry."""
+        for listener in self.listeners:
+            listener(key, text)
+
+
+    def contains_key(self, key):
+        """Determines if the provided key is a key in self.entries."""
+        return self.key_of(key) in self.entries
+
+
+    def first(self):
+        """Get the earliest date with an entry, or None if there are none."""
+        with self.lock:
+            return self.entries.keys()[0] if len(self.entries) > 0 else None
+
+
+    def last(self):
+        """Get the latest date with an entry, or None if there are none."""
+        with self.lock:
+            return self.entries.keys()[-1] if len(self.entries) > 0 else None
+
+
+    def prev(self, key):
+        """Get the nearest date before `key` with an entry, or None.
+        `key` need not have an entry itself."""
+        with self.lock:
+            index = self.entries.bisect_left(self.key_of(key))
+            return self.entries.keys()[index - 1] if index > 0 else None
+
+
+    def next(self, key):
+        """Get the nearest date after `key` with an entry, or None.
+        `key` need not have an entry itself."""
+        with self.lock:
+            index = self.entries.bisect_right(self.key_of(key))
+            return self.entries.keys()[index] if index < len(self.entries) else None
+
+
+    def get_days(self, year, month):
+        """Get the days of the month having an entry, in ascending order."""
+        mask = self.months.get((year, month), 0)
+        return [day for day in range(1, 32) if mask >> day & 1]
+
+
+    def mark_month(self, key):
+        """Set the month index bit for `key`."""
+        month = (int(key[:4]), int(key[5:7]))
+        self.months[month] = self.months.get(month, 0) | 1 << int(key[8:])
+
+
+    def unmark_month(self, key):
+        """Clear the month index bit for `key`."""
+        month = (int(key[:4]), int(key[5:7]))
+        mask = self.months.get(month, 0) & ~(1 << int(key[8:]))
+        if mask:
+            self.months[month] = mask
+        else:
+            self.months.pop(month, None)
+
+
+    @staticmethod
+    def key_of(date):
+        """Get the %Y-%m-%d key for a GLib.DateTime or datetime.date, or the key itself
+        if already a string."""
+        if isinstance(date, str):
+            return date
+        if isinstance(date, datetime.date):
+            return date.strftime('%Y-%m-%d')
+        return date.format('%Y-%m-%d')
+
+
+    def batch_cipher(self):
+        """Get a cipher for whole-journal passes with this journal's key."""
+        return BatchCipher(self.key, self.workers)
+
+
+    def encrypt(self, key, plaintext):
+        """Encrypt the provided `plaintext` of the entry of `key` with this journal's key."""
+        return self.key.encrypt(key, plaintext)
+
+
+    def decrypt(self, key, ciphertext):
+        """Decrypt the provided `ciphertext` of the entry of `key` with this journal's key."""
+        return self.key.decrypt(key, ciphertext)
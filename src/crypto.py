@@ -0,0 +1,266 @@
+"""
+Key derivation and entry encryption.
+"""
+
+# crypto.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import copy
+import hmac
+import base64
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives import hashes
+from .compression import Compressor
+from .tracing import traced
+
+# parameters for newly created or migrated journals
+KDF_ITERATIONS = 600000
+SALT_LENGTH = 16
+
+# parameters used by journals written before the file header existed
+LEGACY_SALT = b'abcd'
+LEGACY_ITERATIONS = 1000
+
+
+class FernetEngine:
+    """
+    Encrypts with Fernet, AES-128-CBC and HMAC-SHA256, as journals always have.
+    Ciphertexts are the raw bytes of Fernet tokens. The date is not authenticated.
+    """
+
+    NAME = 'fernet'
+
+    def __init__(self, derived):
+        """Initialization with the 32 derived key bytes."""
+        self.fernet = Fernet(base64.urlsafe_b64encode(derived))
+
+
+    def encrypt(self, data, _associated):
+        """Encrypt the bytes `data`."""
+        return base64.urlsafe_b64decode(self.fernet.encrypt(data))
+
+
+    def decrypt(self, ciphertext, _associated):
+        """Decrypt the bytes `ciphertext`, raising InvalidToken if it is not authentic."""
+        return self.fernet.decrypt(base64.urlsafe_b64encode(ciphertext))
+
+
+class AeadEngine:
+    """
+    Encrypts with an AEAD cipher of `cryptography`, a single pass that also
+    authenticates the associated data, i.e. an entry's date, so an entry cannot
+    be passed off as another date's. Ciphertexts are a random 96-bit nonce
+    followed by the cipher's output, 28 bytes longer than the plaintext.
+    """
+
+    NAME = None
+    ALGORITHM = None
+    NONCE_SIZE = 12
+
+    def __init__(self, derived):
+        """Initialization with the 32 derived key bytes, from which a key for this
+        cipher alone is made, so it never shares a key with another engine."""
+        self.aead = self.ALGORITHM(hashlib.blake2b(derived, digest_size=32,
+                                                   person=f'journal {self.NAME}'.encode('ascii')[:16]).digest())
+
+
+    def encrypt(self, data, associated):
+        """Encrypt the bytes `data`, authenticating the bytes `associated` with them."""
+        nonce = os.urandom(self.NONCE_SIZE)
+        return nonce + self.aead.encrypt(nonce, data, associated)
+
+
+    def decrypt(self, ciphertext, associated):
+        """Decrypt the bytes `ciphertext`, raising InvalidToken if it, or `associated`,
+        is not authentic, just as Fernet would."""
+        try:
+            return self.aead.decrypt(ciphertext[:self.NONCE_SIZE], ciphertext[self.NONCE_SIZE:], associated)
+        except InvalidTag:
+            raise InvalidToken from None
+
+
+class AesGcmEngine(AeadEngine):
+    """AES-256-GCM, fastest where the CPU has AES instructions."""
+
+    NAME = 'aes-gcm'
+    ALGORITHM = AESGCM
+
+
+class ChaChaEngine(AeadEngine):
+    """ChaCha20-Poly1305, fastest where the CPU lacks AES instructions."""
+
+    NAME = 'chacha20-poly1305'
+    ALGORITHM = ChaCha20Poly1305
+
+
+# the cipher engines by the name a journal header gives
+ENGINES = {engine.NAME: engine for engine in (FernetEngine, AesGcmEngine, ChaChaEngine)}
+# the engine of journals whose header names none
+LEGACY_CIPHER = FernetEngine.NAME
+# the engine of new journals
+DEFAULT_CIPHER = AesGcmEngine.NAME
+
+
+class KeyContext:
+    """
+    The key of an unlocked journal. The password is run through PBKDF2 once
+    and the resulting cipher engine is reused for every entry of the session.
+    """
+
+    def __init__(self, password, salt=None, iterations=KDF_ITERATIONS, cipher=DEFAULT_CIPHER):
+        """Derive the key for `password`, generating a random salt if none is provided,
+        to encrypt with the engine named `cipher`."""
+        self.salt = os.urandom(SALT_LENGTH) if salt is None else salt
+        self.iterations = iterations
+        self.derived = self.derive(password)
+        self.engine = self.make_engine(cipher)
+        # stored in the journal header so a wrong password is caught before any entry is read;
+        # a one-way digest of the key, so it reveals no more than a ciphertext would
+        self.check = base64.b64encode(hashlib.blake2b(self.derived, digest_size=16,
+                                                      person=b'journal check').digest()).decode('ascii')
+        # how entries are compressed before they are encrypted, none until set_compressor
+        self.compressor = Compressor()
+        # the compressor's dictionary encrypted for the header, kept so the header stays the same
+        self.dictionary_token = None
+
+
+    @traced('kdf')
+    def derive(self, password):
+        """Run `password` through PBKDF2 with this key's salt and iterations."""
+        return PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=self.salt,
+                          iterations=self.iterations, backend=default_backend()).derive(password.encode('utf-8'))
+
+
+    def matches(self, password):
+        """Determine if `password` is the one this key was derived from."""
+        return hmac.compare_digest(self.derive(password), self.derived)
+
+
+    def make_engine(self, cipher):
+        """Make the engine named `cipher` with this key."""
+        if cipher not in ENGINES:
+            raise ValueError(f"Unknown cipher '{cipher}'.")
+        return ENGINES[cipher](self.derived)
+
+
+    def with_cipher(self, cipher):
+        """Get a copy of this key encrypting with the engine named `cipher`, without deriving it again."""
+        key = copy.copy(self)
+        key.engine = self.make_engine(cipher)
+        key.compressor = Compressor()
+        key.set_compressor(self.compressor)
+        return key
+
+
+    def set_compressor(self, compressor, dictionary_token=None):
+        """Compress entries with `compressor` from now on. `dictionary_token` is its
+        dictionary as encrypted with this key, encrypted here if not given."""
+        if compressor.dictionary is None:
+            dictionary_token = None
+        elif dictionary_token is None:
+            if compressor.dictionary == self.compressor.dictionary:
+                dictionary_token = self.dictionary_token
+            else:
+                dictionary_token = self.encrypt_header(compressor.dictionary)
+        self.compressor = compressor
+        self.dictionary_token = dictionary_token
+
+
+    def encrypt_header(self, data):
+        """Encrypt the bytes `data` for a header property, returning a string."""
+        return base64.urlsafe_b64encode(self.engine.encrypt(data, b'')).decode('ascii')
+
+
+    def decrypt_header(self, token):
+        """Decrypt a header property written by `encrypt_header`."""
+        return self.engine.decrypt(base64.urlsafe_b64decode(token), b'')
+
+
+    @classmethod
+    def legacy(cls, password):
+        """Derive the key used by journals without a header."""
+        return cls(password, LEGACY_SALT, LEGACY_ITERATIONS, LEGACY_CIPHER)
+
+
+    @traced('entry.encrypt')
+    def encrypt(self, date, plaintext):
+        """Compress, if enabled, and encrypt the provided `plaintext` of the entry of `date`,
+        returning the ciphertext bytes."""
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode('utf-8')
+        return self.engine.encrypt(self.compressor.compress(plaintext), date.encode('ascii'))
+
+
+    @traced('entry.decrypt')
+    def decrypt(self, date, ciphertext):
+        """Decrypt the provided `ciphertext` bytes of the entry of `date`, decompressing
+        if it was compressed. Raises InvalidToken if it is not authentic."""
+        return self.compressor.decompress(self.engine.decrypt(ciphertext, date.encode('ascii'))).decode('utf-8')
+
+
+class BatchCipher:
+    """
+    Encrypts or decrypts whole-journal batches with a `KeyContext` across a pool
+    of threads. The cryptography primitives release the GIL, so chunks run in
+    parallel. Results are always returned in input order.
+    """
+
+    # batches smaller than this are not worth handing to the pool
+    CHUNK_SIZE = 256
+
+    def __init__(self, key, workers=None, chunk_size=CHUNK_SIZE):
+        """Initialization. `workers` defaults to the number of CPUs."""
+        self.key = key
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+
+    @traced('batch.encrypt')
+    def encrypt_all(self, items, progress=None):
+        """Encrypt each (date, plaintext) of `items`, returning a list of ciphertexts in the same order."""
+        return self.map(lambda item: self.key.encrypt(*item), items, progress)
+
+
+    @traced('batch.decrypt')
+    def decrypt_all(self, items, progress=None):
+        """Decrypt each (date, ciphertext) of `items`, returning a list of texts in the same order."""
+        return self.map(lambda item: self.key.decrypt(*item), items, progress)
+
+
+    def map(self, function, values, progress=None):
+        """Apply `function` to each of `values` in chunks spread over the pool,
+        calling `progress(done, total)` as each chunk completes, if given."""
+        values = list(values)
+        if progress is None and (self.workers == 1 or len(values) <= self.chunk_size):
+            return [function(value) for value in values]
+        chunks = [values[i:i + self.chunk_size] for i in range(0, len(values), self.chunk_size)]
+        results = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for chunk in pool.map(lambda chunk: [function(value) for value in chunk], chunks):
+                results.extend(chunk)
+                if progress is not None:
+                    progress(len(results), len(values))
+        return results
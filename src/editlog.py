@@ -0,0 +1,245 @@
+"""
+A write-ahead log of unsaved edits, so they survive a crash.
+"""
+
+# editlog.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import json
+import zlib
+import base64
+import struct
+import hashlib
+import threading
+
+from cryptography.fernet import InvalidToken
+from .tracing import count, span, traced
+
+
+def text_digest(text):
+    """Get a digest of `text` for comparison without keeping a copy of it,
+    as the editor's change tracking does, whose digests are the bases."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def apply_edits(text, edits):
+    """Apply each edit of `edits` to `text` in turn, [offset, text] inserting
+    and [start, end] deleting, in characters, returning the edited text."""
+    for start, change in edits:
+        if isinstance(change, str):
+            text = text[:start] + change + text[start:]
+        else:
+            text = text[:start] + text[change:]
+    return text
+
+
+class EditLog:
+    """
+    An encrypted log of the edits made in the editor since the entry was saved,
+    kept beside the journal. Recording an edit appends to a list in memory, so
+    it costs the same whatever the size of the entry or journal. `flush` hands
+    the batch to a worker thread, which encrypts it with the journal's key,
+    appends it and fsyncs. Each batch is one record, integers little-endian:
+
+        date      10 ASCII bytes, the entry edited
+        size      u32 payload size
+        checksum  u32 CRC-32 of the date and payload
+        payload   ciphertext of {"base", "edits"} as JSON
+
+    `base` is a digest of the saved text the edits start from, so replaying
+    skips the edits of a text saved since. A batch without a base reverts the
+    edits of its date before it. A torn last record is ignored.
+    """
+
+    SUFFIX = '.edits'
+    RECORD = struct.Struct('<10sII')
+
+    def __init__(self, journal):
+        """Initialization. Starts the worker thread."""
+        self.journal = journal
+        self.file_path = journal.file_path + self.SUFFIX
+        # the batch being recorded: its date, base digest and edits
+        self.date = None
+        self.base = None
+        self.edits = []
+        # batches to write, or None asking to discard the log
+        self.queue = []
+        self.condition = threading.Condition()
+        self.stopped = False
+        # not a daemon, so batches queued at exit are still written
+        self.thread = threading.Thread(target=self.run, name='journal-edit-log')
+        self.thread.start()
+
+
+    def insert(self, date, base, offset, text):
+        """Record the insertion of `text` at `offset` in the entry of `date`, whose saved text has digest `base`."""
+        if date != self.date or base != self.base:
+            self.start_batch(date, base)
+        self.edits.append([offset, text])
+
+
+    def delete(self, date, base, start, end):
+        """Record the deletion of the characters from `start` to `end` in the entry of `date`,
+        whose saved text has digest `base`."""
+        if date != self.date or base != self.base:
+            self.start_batch(date, base)
+        self.edits.append([start, end])
+
+
+    def revert(self, date):
+        """Record that the edits of the entry of `date` were thrown away."""
+        self.start_batch(date, None)
+        # a revert has no edits, so it is queued at once
+        with self.condition:
+            self.queue.append((date, None, []))
+            self.condition.notify_all()
+
+
+    def start_batch(self, date, base):
+        """Queue the batch being recorded, if any, and start one for `date` and `base`."""
+        self.flush()
+        self.date = date
+        self.base = base
+        self.edits = []
+
+
+    def flush(self):
+        """Hand the edits recorded so far to the worker thread to write."""
+        if self.edits:
+            with self.condition:
+                self.queue.append((self.date, self.base, self.edits))
+                self.condition.notify_all()
+            self.edits = []
+
+
+    def discard(self):
+        """Delete the log, once everything in it is saved or unwanted."""
+        self.edits = []
+        with self.condition:
+            self.queue = [None]
+            self.condition.notify_all()
+
+
+    def stop(self):
+        """Write any recorded edits, then let the worker thread exit."""
+        self.flush()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+
+    def run(self):
+        """The worker loop."""
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue or self.stopped)
+                if not self.queue:
+                    return
+                batches = self.queue
+                self.queue = []
+            try:
+                self.write(batches)
+            except Exception: # pylint: disable=broad-exception-caught
+                # the log is a safety net; failing to write it must not disturb editing
+                count('edit_log.write_errors')
+
+
+    @traced('edit_log.write')
+    def write(self, batches):
+        """Append `batches` to the log, or delete it where a batch is None."""
+        while None in batches:
+            batches = batches[batches.index(None) + 1:]
+            try:
+                os.remove(self.file_path)
+            except FileNotFoundError:
+                pass
+        if not batches:
+            return
+        with open(self.file_path, 'ab') as file:
+            for date, base, edits in batches:
+                batch = {'base': None if base is None else base64.b64encode(base).decode('ascii'), 'edits': edits}
+                payload = self.journal.key.encrypt(date, json.dumps(batch, separators=(',', ':')))
+                date_bytes = date.encode('ascii')
+                file.write(self.RECORD.pack(date_bytes, len(payload), zlib.crc32(payload, zlib.crc32(date_bytes))))
+                file.write(payload)
+                count('edit_log.batches')
+            file.flush()
+            with span('fsync'):
+                os.fsync(file.fileno())
+
+
+    def read(self):
+        """Yield the (date, base, edits) of each intact batch in the log, dropping a
+        torn end so later batches follow the intact ones."""
+        try:
+            with open(self.file_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return
+        position = 0
+        while position + self.RECORD.size <= len(data):
+            date_bytes, size, checksum = self.RECORD.unpack_from(data, position)
+            start = position + self.RECORD.size
+            payload = data[start:start + size]
+            if len(payload) != size or zlib.crc32(payload, zlib.crc32(date_bytes)) != checksum:
+                break
+            position = start + size
+            date = date_bytes.decode('ascii', errors='replace')
+            try:
+                batch = json.loads(self.journal.key.decrypt(date, payload))
+                base = None if batch['base'] is None else base64.b64decode(batch['base'])
+                edits = batch['edits']
+            except (InvalidToken, ValueError, KeyError, TypeError):
+                # written with a key since changed, or damaged
+                continue
+            yield date, base, edits
+        if position < len(data):
+            with open(self.file_path, 'r+b') as file:
+                file.truncate(position)
+
+
+    @traced('edit_log.recover')
+    def recover(self):
+        """Replay the log against the saved entries, returning {date: text} of the
+        entries whose edits were not saved."""
+        texts = {}
+        # the base of the batch each replayed text last took edits from
+        bases = {}
+        saved = {}
+        for date, base, edits in self.read():
+            if date not in saved:
+                saved[date] = self.journal.get_entry(date) if self.journal.contains_key(date) else ''
+            if base is None:
+                texts.pop(date, None)
+                bases.pop(date, None)
+                continue
+            text = texts.get(date)
+            # batches until the next save share a base, each continuing from the one before;
+            # a new base is the text the earlier batches made, if saved in the editor only
+            if text is None or (bases[date] != base and text_digest(text) != base):
+                if text_digest(saved[date]) != base:
+                    # edits of a text since saved over
+                    continue
+                text = saved[date]
+            try:
+                texts[date] = apply_edits(text, edits)
+            except (ValueError, TypeError):
+                continue
+            bases[date] = base
+        return {date: text for date, text in texts.items() if text != saved[date]}
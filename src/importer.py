@@ -0,0 +1,106 @@
+"""
+Reading entries to import from directories of notes and JSON Lines exports.
+"""
+
+# importer.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import re
+import json
+import datetime
+
+# how `Journal.import_entries` treats a date that already has an entry
+IMPORT_SKIP = 'skip'
+IMPORT_REPLACE = 'replace'
+IMPORT_APPEND = 'append'
+
+# files of a directory tree that are imported
+SUFFIXES = ('.txt', '.md', '.markdown')
+
+# a date as in 2024-01-31, 2024_01_31, 20240131 or 2024/01/31
+DATE = re.compile(r'(?<!\d)(\d{4})[-_./]?(\d{2})[-_./]?(\d{2})(?!\d)')
+
+# report progress after this many records
+PROGRESS_STEP = 500
+
+
+def date_key(value):
+    """Get the %Y-%m-%d key of the first valid date in `value`, or None."""
+    for match in DATE.finditer(value):
+        try:
+            return datetime.date(*map(int, match.groups())).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def find_files(directory, suffixes=SUFFIXES):
+    """Find the files to import under `directory`, dated by their name or else by their
+    path, e.g. 2024-01-31.md or 2024/01/31.txt. Returns a list of (key, path) in path
+    order and a list of the paths that had no date."""
+    files = []
+    undated = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if not name.lower().endswith(suffixes):
+                continue
+            path = os.path.join(root, name)
+            key = date_key(os.path.splitext(name)[0])
+            if key is None:
+                key = date_key(os.path.relpath(os.path.splitext(path)[0], directory))
+            if key is None:
+                undated.append(path)
+            else:
+                files.append((key, path))
+    return files, undated
+
+
+def read_files(files, progress=None):
+    """Yield the (key, text) of each (key, path) of `files`, calling
+    `progress(done, total)` as they are read."""
+    for done, (key, path) in enumerate(files, 1):
+        with open(path, 'rt', encoding='UTF-8', errors='replace') as file:
+            yield key, file.read()
+        if progress is not None and (done % PROGRESS_STEP == 0 or done == len(files)):
+            progress(done, len(files))
+
+
+def read_jsonl(file_path, date_field='date', text_field='text', progress=None):
+    """Yield the (key, text) of each line of a JSON Lines file, such as written by
+    `journal export`, taking the date from the start of `date_field` so timestamps
+    do. Lines without a valid date or text are skipped. `progress(done, total)`
+    is called with the bytes read."""
+    total = os.path.getsize(file_path)
+    with open(file_path, 'rb') as file:
+        for number, line in enumerate(file, 1):
+            if line.strip() == b'':
+                continue
+            try:
+                record = json.loads(line)
+                key = date_key(str(record[date_field])[:10])
+                text = record[text_field]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if key is not None and isinstance(text, str):
+                yield key, text
+            if progress is not None and number % PROGRESS_STEP == 0:
+                progress(file.tell(), total)
+    if progress is not None:
+        progress(total, total)
@@ -0,0 +1,145 @@
+"""
+Saving journals off the main thread.
+"""
+
+# saver.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import stat
+import threading
+from contextlib import contextmanager
+
+from .tracing import span
+
+
+def file_mode(file_path):
+    """Get the permission bits of `file_path`, or those letting only its owner
+    read and write it if there is no such file yet."""
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        return 0o600
+
+
+@contextmanager
+def atomic_writer(file_path, mode='wt', encoding='UTF-8'):
+    """Open a temporary file beside `file_path` for writing. On success it is
+    flushed, fsync'd and renamed over `file_path`, so a crash leaves either the
+    old file or the new one, never a truncated one. A symlink is followed, so it
+    is the link's target that is replaced, and the new file keeps the permissions
+    of the old one."""
+    target = os.path.realpath(file_path)
+    temp_path = f'{target}.tmp'
+    permissions = file_mode(target)
+    if 'b' in mode:
+        encoding = None
+    try:
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, permissions),
+                  mode, encoding=encoding) as file:
+            # set in full, as the umask narrows a new file's mode and a stale one keeps its own
+            os.fchmod(file.fileno(), permissions)
+            yield file
+            file.flush()
+            with span('fsync'):
+                os.fsync(file.fileno())
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    sync_directory(target)
+
+
+def sync_directory(file_path):
+    """Persist a rename to `file_path` by fsync'ing the directory holding it."""
+    directory = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY)
+    try:
+        with span('fsync'):
+            os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+class BackgroundSaver:
+    """
+    Runs `Journal.save` on a worker thread. Requests made while a save is
+    queued or running are coalesced into a single following save. When each
+    save finishes, `on_saved(error)` is passed to `dispatch`, e.g. `GLib.idle_add`,
+    so it runs on the main loop; `error` is None on success.
+    """
+
+    def __init__(self, journal, on_saved=None, dispatch=None):
+        """Initialization. Starts the worker thread."""
+        self.journal = journal
+        self.on_saved = on_saved
+        self.dispatch = dispatch
+        self.condition = threading.Condition()
+        self.pending = False
+        self.saving = False
+        self.stopped = False
+        # not a daemon, so a save under way at exit still completes
+        self.thread = threading.Thread(target=self.run, name='journal-saver')
+        self.thread.start()
+
+
+    def request(self):
+        """Ask for the journal to be saved soon."""
+        with self.condition:
+            self.pending = True
+            self.condition.notify_all()
+
+
+    def flush(self, timeout=None):
+        """Wait up to `timeout` seconds for requested saves to finish.
+        Returns True if there is no save left to do."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.saving, timeout)
+
+
+    def stop(self):
+        """Let the worker finish any requested save, then exit."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+
+    def run(self):
+        """The worker loop."""
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.stopped)
+                if not self.pending:
+                    return
+                self.pending = False
+                self.saving = True
+            error = None
+            try:
+                self.journal.save()
+            except Exception as ex: # pylint: disable=broad-exception-caught
+                error = ex
+            with self.condition:
+                self.saving = False
+                self.condition.notify_all()
+            if self.on_saved is not None:
+                if self.dispatch is not None:
+                    self.dispatch(self.on_saved, error)
+                else:
+                    self.on_saved(error)
@@ -0,0 +1,250 @@
+"""
+Full-text search over journal entries.
+"""
+
+# search.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import re
+import math
+import threading
+
+from sortedcontainers import SortedList
+from .sidecar import FingerprintSidecar
+from .tracing import traced
+
+WORD = re.compile(r'\w+')
+QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 ranking parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """Split `text` into lower-cased words, returning a list in order of appearance."""
+    return WORD.findall(text.casefold())
+
+
+def word_positions(text):
+    """Get {word: [positions]} for the words of `text`."""
+    positions = {}
+    for position, word in enumerate(tokenize(text)):
+        positions.setdefault(word, []).append(position)
+    return positions
+
+
+class SearchIndex:
+    """
+    An inverted index from words to the dates whose entries contain them, with
+    the word positions in each entry. Supports words, "quoted phrases" and
+    prefix* queries, all of which must match, ranked by BM25.
+    """
+
+    def __init__(self):
+        """Initialization."""
+        self.lock = threading.Lock()
+        # term -> {date: [positions]}
+        self.postings = {}
+        # all indexed terms in order, for prefix queries
+        self.terms = SortedList()
+        # date -> number of words in its entry
+        self.lengths = {}
+        # date -> the distinct words of its entry, for removal
+        self.entry_words = {}
+        self.total_length = 0
+        # dates updated while a build is running, which the build must not overwrite
+        self.updated = None
+
+
+    @traced('search.build')
+    def build(self, entries):
+        """Index each (date, text) of `entries`, e.g. from `Journal.iter_entries`.
+        Meant for a worker thread; `update` may be called meanwhile."""
+        self.restore((key, word_positions(text)) for key, text in entries)
+
+
+    def restore(self, records):
+        """Index each (date, {word: [positions]}) of `records`, as `build` does."""
+        with self.lock:
+            self.updated = set()
+        try:
+            for key, positions in records:
+                with self.lock:
+                    if key not in self.updated:
+                        self.remove_entry(key)
+                        self.add_entry(key, positions)
+        finally:
+            with self.lock:
+                self.updated = None
+
+
+    def update(self, key, text):
+        """Re-index one date, removing it if `text` is None or blank.
+        Has the signature of a `Journal` listener."""
+        with self.lock:
+            self.remove_entry(key)
+            if text:
+                self.add_entry(key, word_positions(text))
+            if self.updated is not None:
+                self.updated.add(key)
+
+
+    def add_entry(self, key, positions):
+        """Index the {word: [positions]} of an entry not currently indexed.
+        The caller holds the lock."""
+        postings = self.postings
+        for word, entry_positions in positions.items():
+            documents = postings.get(word)
+            if documents is None:
+                documents = postings[word] = {}
+                self.terms.add(word)
+            documents[key] = entry_positions
+        length = sum(map(len, positions.values()))
+        self.lengths[key] = length
+        self.entry_words[key] = list(positions)
+        self.total_length += length
+
+
+    def get_positions(self, key):
+        """Get the {word: [positions]} of an indexed entry, or None if not indexed."""
+        with self.lock:
+            words = self.entry_words.get(key)
+            if words is None:
+                return None
+            return {word: self.postings[word][key] for word in words}
+
+
+    def remove_entry(self, key):
+        """Drop an entry from the index if present. The caller holds the lock."""
+        length = self.lengths.pop(key, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for word in self.entry_words.pop(key):
+            documents = self.postings[word]
+            del documents[key]
+            if not documents:
+                del self.postings[word]
+                self.terms.remove(word)
+
+
+    @traced('search.query')
+    def search(self, query, limit=None):
+        """Get the dates matching `query` as a list of (date, score), best first."""
+        with self.lock:
+            matches = None
+            frequencies = []
+            for phrase, word in QUERY_PART.findall(query):
+                if phrase:
+                    clause = self.match_words(tokenize(phrase))
+                elif word.endswith('*'):
+                    clause = self.match_prefix(tokenize(word[:-1]))
+                else:
+                    clause = self.match_words(tokenize(word))
+                if clause is None:
+                    continue
+                frequencies.append(clause)
+                matches = set(clause) if matches is None else matches.intersection(clause)
+                if not matches:
+                    return []
+            if not matches:
+                return []
+            results = [(key, self.score(key, frequencies)) for key in matches]
+        results.sort(key=lambda result: (result[1], result[0]), reverse=True)
+        return results[:limit] if limit is not None else results
+
+
+    def match_words(self, words):
+        """Get {date: frequency} for a clause, or None if it has no words. Several
+        words, from a quoted phrase or a query word like "don't", must be consecutive."""
+        if not words:
+            return None
+        if len(words) > 1:
+            return self.match_phrase(words)
+        return {key: len(positions) for key, positions in self.postings.get(words[0], {}).items()}
+
+
+    def match_prefix(self, words):
+        """Get {date: frequency} of all terms starting with the one word in `words`."""
+        if len(words) != 1:
+            return self.match_words(words)
+        prefix = words[0]
+        frequencies = {}
+        for term in self.terms.irange(minimum=prefix):
+            if not term.startswith(prefix):
+                break
+            for key, positions in self.postings[term].items():
+                frequencies[key] = frequencies.get(key, 0) + len(positions)
+        return frequencies
+
+
+    def match_phrase(self, words):
+        """Get {date: occurrences} of `words` appearing consecutively."""
+        postings = [self.postings.get(word, {}) for word in words]
+        candidates = set(min(postings, key=len))
+        for documents in postings:
+            candidates.intersection_update(documents)
+        frequencies = {}
+        for key in candidates:
+            starts = set(postings[0][key])
+            for offset, documents in enumerate(postings[1:], 1):
+                starts.intersection_update(position - offset for position in documents[key])
+                if not starts:
+                    break
+            if starts:
+                frequencies[key] = len(starts)
+        return frequencies
+
+
+    def score(self, key, clauses):
+        """BM25 score of an entry for the frequencies of each query clause."""
+        count = len(self.lengths)
+        average_length = self.total_length / count if count else 0
+        length_ratio = self.lengths[key] / average_length if average_length else 0
+        score = 0.0
+        for frequencies in clauses:
+            frequency = frequencies[key]
+            idf = math.log(1 + (count - len(frequencies) + 0.5) / (len(frequencies) + 0.5))
+            score += idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * length_ratio))
+        return score
+
+
+class IndexSidecar(FingerprintSidecar):
+    """
+    A `SearchIndex` saved beside its journal so search is ready soon after
+    unlock, each entry's record holding its word positions.
+    """
+
+    VERSION = 3
+    SUFFIX = '.index'
+
+    def __init__(self, journal, index):
+        """Initialization."""
+        self.index = index
+        super().__init__(journal)
+
+
+    def payload(self, key):
+        """Get the word positions of the entry of `key`, or None if it is not indexed."""
+        return self.index.get_positions(key)
+
+
+    def restore(self, items):
+        """Index each (date, word positions) of `items`."""
+        self.index.restore(items)
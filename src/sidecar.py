@@ -0,0 +1,183 @@
+"""
+Data derived from entries, saved beside the journal.
+"""
+
+# sidecar.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import json
+import base64
+import threading
+
+from cryptography.fernet import InvalidToken
+from .saver import atomic_writer
+from .tracing import traced
+
+
+class FingerprintSidecar:
+    """
+    Data derived from each entry, e.g. its word positions, saved beside the
+    journal so it is ready soon after unlock without decrypting the entries.
+    Each entry's data is a record encrypted with the journal's key and tagged
+    with a fingerprint of the entry's ciphertext, so records of entries changed
+    elsewhere are detected as stale. The file is a log of JSON lines after a
+    header line naming the key: a save appends [date, fingerprint, token] for
+    each saved entry, the last of a date winning and [date, null, null]
+    removing it, so its cost follows the size of the edit. The log is rewritten
+    once mostly superseded records, or when the journal's key changes. A line
+    torn by a crash is skipped.
+
+    Subclasses name the file with SUFFIX and their format with VERSION, and
+    give and take the data of each entry with `payload` and `restore`.
+    """
+
+    VERSION = None
+    SUFFIX = None
+    # rewrite when superseded records make up this share of the log...
+    GARBAGE_RATIO = 0.5
+    # ...and it holds at least this many
+    COMPACT_RECORDS = 1000
+
+    def __init__(self, journal):
+        """Initialization."""
+        self.journal = journal
+        self.file_path = journal.file_path + self.SUFFIX
+        # date -> [entry fingerprint, encrypted data]
+        self.records = {}
+        # records in the log, superseded or not, and the key named by its header,
+        # None until it is read or written
+        self.logged = 0
+        self.logged_key = None
+        self.lock = threading.Lock()
+
+
+    def payload(self, key):
+        """Get the data derived from the entry of `key` as JSON-able values, or None if there is none."""
+        raise NotImplementedError
+
+
+    def restore(self, items):
+        """Take the (date, data) of each valid record read from the sidecar."""
+        raise NotImplementedError
+
+
+    def key_id(self):
+        """Identify the journal key the records are encrypted with."""
+        return base64.b64encode(self.journal.key.salt).decode('ascii')
+
+
+    @traced('sidecar.load')
+    def load(self):
+        """Restore the data of the valid records of the sidecar and return the dates
+        whose data must still be derived from the journal: those without a record or
+        whose entry changed, or all of them if the sidecar is missing, outdated or corrupt."""
+        with self.lock:
+            try:
+                records = self.read()
+                fingerprints = self.journal.get_fingerprints()
+                valid = [key for key, record in records.items() if fingerprints.get(key) == record[0]]
+                payloads = self.journal.batch_cipher().decrypt_all((key, base64.b64decode(records[key][1]))
+                                                                   for key in valid)
+                data = [json.loads(payload) for payload in payloads]
+            except (OSError, ValueError, KeyError, TypeError, IndexError, InvalidToken):
+                # derive everything again, rewriting the sidecar on the next store
+                self.records = {}
+                self.logged_key = None
+                return list(self.journal.get_keys())
+            self.records = {key: records[key] for key in valid}
+        self.restore(zip(valid, data))
+        return [key for key in self.journal.get_keys() if key not in self.records]
+
+
+    def read(self):
+        """Replay the log, returning {date: [fingerprint, token]} of the last record of each
+        date, and raising ValueError if it is outdated or of another key."""
+        records = {}
+        logged = 0
+        with open(self.file_path, 'rt', encoding='UTF-8') as file:
+            header = json.loads(file.readline())
+            if header['version'] != self.VERSION or header['key'] != self.key_id():
+                raise ValueError('sidecar does not match journal')
+            for line in file:
+                try:
+                    key, fingerprint, token = json.loads(line)
+                except ValueError:
+                    # torn by a crash mid-append
+                    continue
+                logged += 1
+                if fingerprint is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = [fingerprint, token]
+        self.logged = logged
+        self.logged_key = header['key']
+        return records
+
+
+    @traced('sidecar.store')
+    def store(self, keys):
+        """Record the data of the saved `keys`, appending them to the sidecar.
+        Has the signature of a `Journal` save listener."""
+        with self.lock:
+            fingerprints = self.journal.get_fingerprints(keys)
+            changed = []
+            payloads = []
+            lines = []
+            for key in keys:
+                data = self.payload(key)
+                if key not in fingerprints or data is None or key in self.journal.dirty:
+                    # removed, not yet derived, or edited since saving
+                    if self.records.pop(key, None) is not None:
+                        lines.append([key, None, None])
+                else:
+                    changed.append(key)
+                    payloads.append(json.dumps(data, separators=(',', ':')))
+            tokens = self.journal.batch_cipher().encrypt_all(zip(changed, payloads))
+            for key, token in zip(changed, tokens):
+                self.records[key] = [fingerprints[key], base64.b64encode(token).decode('ascii')]
+                lines.append([key, *self.records[key]])
+            key_id = self.key_id()
+            logged = self.logged + len(lines)
+            if self.logged_key != key_id or (logged >= self.COMPACT_RECORDS and
+                                             1 - len(self.records) / logged >= self.GARBAGE_RATIO):
+                self.write(key_id)
+            elif lines:
+                appended = ''.join(json.dumps(line, separators=(',', ':')) + '\n' for line in lines).encode('utf-8')
+                try:
+                    # a cache, so not fsync'd; a torn line only costs deriving its entry again
+                    with open(self.file_path, 'a+b') as file:
+                        file.seek(-1, os.SEEK_END)
+                        if file.read(1) != b'\n':
+                            # start after a line torn by a crash
+                            appended = b'\n' + appended
+                        file.write(appended)
+                    self.logged = logged
+                except OSError:
+                    # emptied or removed meanwhile
+                    self.write(key_id)
+
+
+    def write(self, key_id):
+        """Atomically replace the log with a header naming `key_id` and the current records."""
+        with atomic_writer(self.file_path) as file:
+            file.write(json.dumps({'version': self.VERSION, 'key': key_id}) + '\n')
+            for key, record in self.records.items():
+                file.write(json.dumps([key, *record], separators=(',', ':')) + '\n')
+        self.logged = len(self.records)
+        self.logged_key = key_id
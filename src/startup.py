@@ -0,0 +1,66 @@
+"""
+Measurement of launch speed, enabled by the JOURNAL_STARTUP environment variable.
+"""
+
+# startup.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import sys
+import time
+
+# set to 1 to print the time of each startup milestone to stderr,
+# or to 'exit' to also quit once the first frame is drawn
+MODE = os.environ.get('JOURNAL_STARTUP', '')
+ENABLED = MODE != ''
+EXIT_AFTER_FIRST_FRAME = MODE == 'exit'
+
+
+def process_age():
+    """Get the seconds since this process started, to within a clock tick, or since
+    this module was loaded where the process start time is unavailable."""
+    try:
+        with open('/proc/self/stat', 'rb') as file:
+            stat = file.read()
+        # fields resume after the command name, which may contain spaces;
+        # the start time in clock ticks since boot is the 22nd field
+        start_ticks = int(stat[stat.rindex(b')') + 2:].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+# the process age when loaded, then kept current with the monotonic clock
+LOADED_AGE = process_age()
+LOADED_AT = time.monotonic()
+marks = {}
+
+
+def mark(name):
+    """Record the first time `name` is reached, printing it if enabled."""
+    if name in marks:
+        return
+    marks[name] = LOADED_AGE + time.monotonic() - LOADED_AT
+    if ENABLED:
+        print(f'startup: {name} at {marks[name] * 1000:.1f} ms', file=sys.stderr, flush=True)
+
+
+def report(name, seconds):
+    """Print how long a step took, if enabled."""
+    if ENABLED:
+        print(f'startup: {name} took {seconds * 1000:.1f} ms', file=sys.stderr, flush=True)
@@ -0,0 +1,192 @@
+"""
+Writing statistics, kept up to date entry by entry.
+"""
+
+# stats.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import datetime
+import threading
+
+from sortedcontainers import SortedDict
+from .sidecar import FingerprintSidecar
+from .tracing import traced
+
+
+def count_text(text):
+    """Get the (words, characters) of `text`."""
+    return len(text.split()), len(text)
+
+
+class JournalStats:
+    """
+    The word and character counts of each entry, with totals for each month and
+    for the whole journal that are adjusted as entries change, so statistics
+    never need the entries decrypted again. Streaks are found from the dates.
+    """
+
+    def __init__(self):
+        """Initialization."""
+        self.lock = threading.Lock()
+        # date -> (words, characters)
+        self.counts = SortedDict()
+        # (year, month) -> [entries, words, characters]
+        self.months = {}
+        self.words = 0
+        self.characters = 0
+        # the longest streak of consecutive days, None until found again after a date is added or removed
+        self.longest = None
+        # dates updated while a build is running, which the build must not overwrite
+        self.updated = None
+
+
+    @traced('stats.build')
+    def build(self, entries):
+        """Count each (date, text) of `entries`, e.g. from `Journal.iter_entries`.
+        Meant for a worker thread; `update` may be called meanwhile."""
+        self.restore((key, count_text(text)) for key, text in entries)
+
+
+    def restore(self, records):
+        """Set the (date, (words, characters)) of each of `records`, as `build` does."""
+        with self.lock:
+            self.updated = set()
+        try:
+            for key, counts in records:
+                with self.lock:
+                    if key not in self.updated:
+                        self.set_counts(key, counts)
+        finally:
+            with self.lock:
+                self.updated = None
+
+
+    def update(self, key, text):
+        """Recount one date, removing it if `text` is None or blank.
+        Has the signature of a `Journal` listener."""
+        with self.lock:
+            self.set_counts(key, count_text(text) if text else None)
+            if self.updated is not None:
+                self.updated.add(key)
+
+
+    def set_counts(self, key, counts):
+        """Replace the counts of a date, or remove them if `counts` is None,
+        adjusting the totals. The caller holds the lock."""
+        old = self.counts.pop(key, None)
+        if old is not None:
+            self.adjust(key, old, -1)
+        if counts is not None:
+            self.counts[key] = counts
+            self.adjust(key, counts, 1)
+        if (old is None) != (counts is None):
+            self.longest = None
+
+
+    def adjust(self, key, counts, sign):
+        """Add or, with a `sign` of -1, take away the counts of a date from the totals."""
+        words, characters = counts
+        month = (int(key[:4]), int(key[5:7]))
+        totals = self.months.setdefault(month, [0, 0, 0])
+        totals[0] += sign
+        totals[1] += sign * words
+        totals[2] += sign * characters
+        if totals[0] == 0:
+            del self.months[month]
+        self.words += sign * words
+        self.characters += sign * characters
+
+
+    def get_counts(self, key):
+        """Get the (words, characters) of a counted date, or None."""
+        with self.lock:
+            return self.counts.get(key)
+
+
+    def streaks(self, today):
+        """Get the current streak, of consecutive days with an entry up to `today`
+        or to the day before if today has none yet, and the longest streak."""
+        with self.lock:
+            day = today if today.isoformat() in self.counts else today - datetime.timedelta(days=1)
+            current = 0
+            while day.isoformat() in self.counts:
+                current += 1
+                day -= datetime.timedelta(days=1)
+            if self.longest is None:
+                self.longest = 0
+                run = 0
+                previous = None
+                for key in self.counts:
+                    ordinal = datetime.date.fromisoformat(key).toordinal()
+                    run = run + 1 if previous == ordinal - 1 else 1
+                    self.longest = max(self.longest, run)
+                    previous = ordinal
+            return current, self.longest
+
+
+    def summary(self, today=None):
+        """Get the totals, means and streaks as a dict."""
+        current, longest = self.streaks(today or datetime.date.today())
+        with self.lock:
+            entries = len(self.counts)
+            first = self.counts.keys()[0] if entries else None
+            last = self.counts.keys()[-1] if entries else None
+            days = (datetime.date.fromisoformat(last) - datetime.date.fromisoformat(first)).days + 1 if entries else 0
+            return {
+                'entries': entries,
+                'words': self.words,
+                'characters': self.characters,
+                'mean_words': round(self.words / entries, 1) if entries else 0,
+                'words_per_day': round(self.words / days, 1) if days else 0,
+                'first': first,
+                'last': last,
+                'current_streak': current,
+                'longest_streak': longest,
+            }
+
+
+    def by_month(self):
+        """Get a (year, month, entries, words, characters) for each month with entries, latest first."""
+        with self.lock:
+            return [(year, month, *totals) for (year, month), totals in sorted(self.months.items(), reverse=True)]
+
+
+class StatsSidecar(FingerprintSidecar):
+    """
+    A `JournalStats` saved beside its journal so statistics are ready at unlock,
+    each entry's record holding its word and character counts.
+    """
+
+    VERSION = 2
+    SUFFIX = '.stats'
+
+    def __init__(self, journal, stats):
+        """Initialization."""
+        self.stats = stats
+        super().__init__(journal)
+
+
+    def payload(self, key):
+        """Get the [words, characters] of the entry of `key`, or None if it is not counted."""
+        counts = self.stats.get_counts(key)
+        return None if counts is None else list(counts)
+
+
+    def restore(self, items):
+        """Count each (date, [words, characters]) of `items`."""
+        self.stats.restore((key, tuple(counts)) for key, counts in items)
@@ -0,0 +1,434 @@
+"""
+The on-disk formats of a journal.
+"""
+
+# storage.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import json
+import mmap
+import zlib
+import base64
+import shutil
+import struct
+import tempfile
+from collections.abc import MutableMapping
+
+import jprops
+from sortedcontainers import SortedDict
+from .saver import atomic_writer
+from .tracing import count, span, traced
+
+# header properties are kept apart from the date keys by this prefix
+HEADER_PREFIX = 'journal.'
+
+# bytes copied at a time from a spooled file
+COPY_SIZE = 1024 * 1024
+
+# log records replayed between progress reports and cancellation checks
+PROGRESS_RECORDS = 4096
+
+
+class Cancelled(Exception):
+    """Raised inside a long operation when its caller asks it to stop."""
+
+
+class PropertiesFormat:
+    """
+    The original format: a Java-style .properties file of date=Fernet token
+    lines, plus header properties. Parsed and written in full. Ciphertexts are
+    held as bytes like in the other formats, so tokens are decoded on reading.
+    """
+
+    def read_header(self, file_path):
+        """Get None, as the header properties can only be found by reading the whole file."""
+        return None
+
+
+    @traced('storage.read.properties')
+    def read(self, file_path, progress=None, cancelled=None):
+        """Read a journal file, returning its header properties and a SortedDict
+        of date -> ciphertext. The file is parsed in one go, so `progress` is
+        only called once done and `cancelled` is not polled."""
+        with open(file_path, 'rt', encoding='UTF-8') as file:
+            encrypted = jprops.load_properties(file, SortedDict)
+        header = {}
+        for key in [key for key in encrypted if key.startswith(HEADER_PREFIX)]:
+            header[key] = encrypted.pop(key)
+        for key, token in encrypted.items():
+            encrypted[key] = base64.urlsafe_b64decode(token)
+        if progress is not None:
+            progress(1, 1)
+        return header, encrypted
+
+
+    @traced('storage.write.properties')
+    def write(self, file_path, header, ciphertexts):
+        """Atomically replace `file_path` with the header and (date, ciphertext) items."""
+        with atomic_writer(file_path) as file:
+            properties = dict(header)
+            properties.update((date, base64.urlsafe_b64encode(ciphertext).decode('ascii'))
+                              for date, ciphertext in ciphertexts)
+            jprops.store_properties(file, properties)
+
+
+    def save(self, file_path, header, changes, all_ciphertexts):
+        """Save the journal by rewriting it with `all_ciphertexts()`, ignoring
+        which (date, ciphertext or None) `changes` brought this save about."""
+        self.write(file_path, header, all_ciphertexts())
+
+
+class ContainerFormat:
+    """
+    An indexed binary file, read through mmap so one entry can be fetched
+    without parsing the others. Layout, integers little-endian:
+
+        magic         8 bytes
+        header size   u32, then the header properties as UTF-8 JSON
+        entry count   u32, then per entry in date order:
+                      date (10 ASCII bytes), blob offset (u64), blob size (u32)
+        blobs         ciphertexts as the journal's cipher engine makes them
+    """
+
+    MAGIC = b'FWJRNL\x00\x01'
+    SIZE = struct.Struct('<I')
+    TABLE_ENTRY = struct.Struct('<10sQI')
+
+    def read_header(self, file_path):
+        """Get the header properties without reading the entries."""
+        with open(file_path, 'rb') as file:
+            file.seek(len(self.MAGIC))
+            (header_size,) = self.SIZE.unpack(file.read(self.SIZE.size))
+            return json.loads(file.read(header_size).decode('utf-8'))
+
+
+    @traced('storage.read.container')
+    def read(self, file_path, progress=None, cancelled=None):
+        """Read a journal file, returning its header properties and a mapping
+        of date -> ciphertext that reads each blob on access. Only the table
+        is parsed, in one go, so `progress` is only called once done and
+        `cancelled` is not polled."""
+        with open(file_path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        position = len(self.MAGIC)
+        (header_size,) = self.SIZE.unpack_from(data, position)
+        position += self.SIZE.size
+        header = json.loads(data[position:position + header_size].decode('utf-8'))
+        position += header_size
+        (count,) = self.SIZE.unpack_from(data, position)
+        position += self.SIZE.size
+        table_end = position + count * self.TABLE_ENTRY.size
+        table = SortedDict((date.decode('ascii'), (offset, size))
+                           for date, offset, size in self.TABLE_ENTRY.iter_unpack(data[position:table_end]))
+        if progress is not None:
+            progress(1, 1)
+        return header, ContainerCiphertexts(data, table)
+
+
+    @traced('storage.write.container')
+    def write(self, file_path, header, ciphertexts):
+        """Atomically replace `file_path` with the header and (date, ciphertext) items.
+        Items not given as a list, e.g. the generator of a re-encryption, are streamed:
+        their blobs are spooled to an unnamed file beside the journal until the table
+        that comes before them is known, so they are never all held in memory."""
+        if isinstance(ciphertexts, list):
+            self.write_file(file_path, header, [(date, len(blob)) for date, blob in ciphertexts],
+                            lambda file: file.writelines(blob for _, blob in ciphertexts))
+            return
+        with tempfile.TemporaryFile(dir=os.path.dirname(os.path.realpath(file_path))) as spool:
+            table = []
+            for date, blob in ciphertexts:
+                spool.write(blob)
+                table.append((date, len(blob)))
+            spool.seek(0)
+            self.write_file(file_path, header, table, lambda file: shutil.copyfileobj(spool, file, COPY_SIZE))
+
+
+    def write_file(self, file_path, header, table, write_blobs):
+        """Atomically replace `file_path` with the header, a table of the (date, blob size)
+        items of `table`, and the blobs in the same order, written by `write_blobs(file)`."""
+        header_bytes = json.dumps(header).encode('utf-8')
+        offset = (len(self.MAGIC) + 2 * self.SIZE.size + len(header_bytes)
+                  + len(table) * self.TABLE_ENTRY.size)
+        with atomic_writer(file_path, 'wb') as file:
+            file.write(self.MAGIC)
+            file.write(self.SIZE.pack(len(header_bytes)))
+            file.write(header_bytes)
+            file.write(self.SIZE.pack(len(table)))
+            for date, size in table:
+                file.write(self.TABLE_ENTRY.pack(date.encode('ascii'), offset, size))
+                offset += size
+            write_blobs(file)
+
+
+    def save(self, file_path, header, changes, all_ciphertexts):
+        """Save the journal by rewriting it with `all_ciphertexts()`, ignoring
+        which (date, ciphertext or None) `changes` brought this save about."""
+        self.write(file_path, header, all_ciphertexts())
+
+
+class LogFormat:
+    """
+    An append-only log of records, each saved change costing one record.
+    Reading replays the log keeping the latest record per date; the log is
+    compacted by rewriting it once mostly superseded. Record layout, integers
+    little-endian:
+
+        kind      1 byte: H header properties as UTF-8 JSON, E entry, D deletion
+        date      10 ASCII bytes, zeros for a header
+        revision  u64, increasing through the log
+        size      u32 payload size
+        checksum  u32 CRC-32 of the fields above and the payload
+        payload   ciphertext of an entry, nothing for a deletion
+
+    A record that is cut short or fails its checksum ends the log, so a crash
+    mid-append loses that record only.
+    """
+
+    MAGIC = b'FWJLOG\x00\x01'
+    RECORD = struct.Struct('<c10sQI')
+    CHECKSUM = struct.Struct('<I')
+    # compact when superseded records make up this share of the file...
+    GARBAGE_RATIO = 0.5
+    # ...and the file is at least this large
+    COMPACT_SIZE = 256 * 1024
+
+    def __init__(self):
+        """Initialization."""
+        self.header = None
+        # end of the last valid record, where the next is appended
+        self.end = 0
+        # bytes taken by the records still in effect
+        self.live = {}
+        self.header_size = 0
+        self.revision = 0
+
+
+    def read_header(self, file_path):
+        """Get the header properties from the first record, where every rewrite of
+        the log puts them, or None if it is not a header record."""
+        with open(file_path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        with data:
+            record = self.read_record(data, len(self.MAGIC))
+            if record is None or record[0] != b'H':
+                return None
+            _, _, _, offset, size = record
+            return json.loads(data[offset:offset + size].decode('utf-8'))
+
+
+    @traced('storage.read.log')
+    def read(self, file_path, progress=None, cancelled=None):
+        """Replay a journal log, returning its latest header properties and a mapping
+        of date -> ciphertext that reads each blob on access. `progress(done, total)`
+        is called with the bytes replayed and `cancelled()` is polled as it goes,
+        raising Cancelled if it returns True."""
+        with open(file_path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        table = SortedDict()
+        position = len(self.MAGIC)
+        records = 0
+        while True:
+            records += 1
+            if records % PROGRESS_RECORDS == 0:
+                if cancelled is not None and cancelled():
+                    data.close()
+                    raise Cancelled()
+                if progress is not None:
+                    progress(position, len(data))
+            record = self.read_record(data, position)
+            if record is None:
+                break
+            kind, date, revision, offset, size = record
+            record_size = offset + size - position
+            if kind == b'H':
+                self.header = json.loads(data[offset:offset + size].decode('utf-8'))
+                self.header_size = record_size
+            elif kind == b'E':
+                table[date] = (offset, size)
+                self.live[date] = record_size
+            else:
+                table.pop(date, None)
+                self.live.pop(date, None)
+            self.revision = revision
+            position = offset + size
+        self.end = position
+        if progress is not None:
+            progress(len(data), len(data))
+        return self.header or {}, ContainerCiphertexts(data, table)
+
+
+    def read_record(self, data, position):
+        """Read the record at `position`, returning (kind, date, revision, payload offset,
+        payload size), or None at the end of the log or at a torn or corrupt record."""
+        offset = position + self.RECORD.size + self.CHECKSUM.size
+        if offset > len(data):
+            return None
+        kind, date, revision, size = self.RECORD.unpack_from(data, position)
+        if kind not in (b'H', b'E', b'D') or offset + size > len(data):
+            return None
+        (checksum,) = self.CHECKSUM.unpack_from(data, position + self.RECORD.size)
+        fields = data[position:position + self.RECORD.size]
+        if zlib.crc32(data[offset:offset + size], zlib.crc32(fields)) != checksum:
+            return None
+        return kind, date.decode('ascii'), revision, offset, size
+
+
+    def pack_record(self, kind, date, payload):
+        """Make the bytes of a new record."""
+        self.revision += 1
+        fields = self.RECORD.pack(kind, date.encode('ascii'), self.revision, len(payload))
+        return fields + self.CHECKSUM.pack(zlib.crc32(payload, zlib.crc32(fields))) + payload
+
+
+    @traced('storage.write.log')
+    def write(self, file_path, header, ciphertexts):
+        """Atomically replace `file_path` with a compacted log of the header and
+        (date, ciphertext) items."""
+        self.live = {}
+        header_record = self.pack_record(b'H', '', json.dumps(header).encode('utf-8'))
+        with atomic_writer(file_path, 'wb') as file:
+            file.write(self.MAGIC)
+            file.write(header_record)
+            for date, ciphertext in ciphertexts:
+                record = self.pack_record(b'E', date, ciphertext)
+                self.live[date] = len(record)
+                file.write(record)
+            self.end = file.tell()
+        self.header = dict(header)
+        self.header_size = len(header_record)
+
+
+    @traced('storage.append.log')
+    def save(self, file_path, header, changes, all_ciphertexts):
+        """Append a record per (date, ciphertext or None) of `changes`, then
+        compact with `all_ciphertexts()` if the log is mostly garbage. A changed
+        header, e.g. a new key, is written by compacting."""
+        if self.end == 0 or header != self.header:
+            self.write(file_path, header, all_ciphertexts())
+            return
+        with open(file_path, 'r+b') as file:
+            # drop any torn record left by a crash
+            file.truncate(self.end)
+            file.seek(self.end)
+            for date, ciphertext in changes:
+                if ciphertext is None:
+                    record = self.pack_record(b'D', date, b'')
+                    self.live.pop(date, None)
+                else:
+                    record = self.pack_record(b'E', date, ciphertext)
+                    self.live[date] = len(record)
+                file.write(record)
+                count('storage.records_appended')
+            file.flush()
+            with span('fsync'):
+                os.fsync(file.fileno())
+            self.end = file.tell()
+        if self.end >= self.COMPACT_SIZE and self.garbage_ratio() >= self.GARBAGE_RATIO:
+            self.write(file_path, header, all_ciphertexts())
+
+
+    def garbage_ratio(self):
+        """Get the share of the log taken by superseded records."""
+        live = len(self.MAGIC) + self.header_size + sum(self.live.values())
+        return 1 - live / self.end if self.end else 0
+
+
+class ContainerCiphertexts(MutableMapping):
+    """
+    The date -> ciphertext bytes mapping of a container file. Values are read
+    from the mapped file when accessed; values set since it was read are held in memory.
+    """
+
+    def __init__(self, data, table):
+        """Initialization. `table` maps each date to the (offset, size) of its blob in `data`."""
+        self.data = data
+        self.table = table
+
+
+    def __getitem__(self, key):
+        value = self.table[key]
+        if isinstance(value, bytes):
+            return value
+        offset, size = value
+        return self.data[offset:offset + size]
+
+
+    def __setitem__(self, key, value):
+        self.table[key] = value
+
+
+    def __delitem__(self, key):
+        del self.table[key]
+
+
+    def __iter__(self):
+        return iter(self.table)
+
+
+    def __len__(self):
+        return len(self.table)
+
+
+    def __contains__(self, key):
+        return key in self.table
+
+
+    def keys(self):
+        """Get the dates in order, as an indexable view."""
+        return self.table.keys()
+
+
+def detect_format(file_path):
+    """Get a new instance of the format of the journal at `file_path`,
+    or None for a missing or empty file, i.e. a new journal."""
+    try:
+        with open(file_path, 'rb') as file:
+            magic = file.read(len(ContainerFormat.MAGIC))
+    except FileNotFoundError:
+        magic = b''
+    if magic == b'':
+        return None
+    if magic == ContainerFormat.MAGIC:
+        return ContainerFormat()
+    if magic == LogFormat.MAGIC:
+        return LogFormat()
+    return PropertiesFormat()
+
+
+def read_header(file_path):
+    """Get the header properties of the journal at `file_path` without reading its
+    entries, an empty dict for a new journal, or None if the format cannot tell
+    them apart from the entries."""
+    journal_format = detect_format(file_path)
+    if journal_format is None:
+        return {}
+    return journal_format.read_header(file_path)
+
+
+def read_journal(file_path, progress=None, cancelled=None):
+    """Read the journal at `file_path` in whichever format it is, returning its
+    format, header properties and date -> ciphertext mapping. The format is None
+    for a missing or empty file, i.e. a new journal. `progress` and `cancelled`
+    are passed to the format's `read`."""
+    journal_format = detect_format(file_path)
+    if journal_format is None:
+        return None, {}, SortedDict()
+    header, ciphertexts = journal_format.read(file_path, progress, cancelled)
+    return journal_format, header, ciphertexts
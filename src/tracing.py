@@ -0,0 +1,157 @@
+"""
+Timing spans and counters for the hot paths, enabled by environment variables.
+"""
+
+# tracing.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import functools
+from contextlib import nullcontext
+
+# JOURNAL_TRACE=1 prints a summary of spans and counters to stderr on exit;
+# JOURNAL_TRACE_FILE=path also writes the spans as a Chrome trace, for
+# chrome://tracing or https://ui.perfetto.dev
+TRACE_FILE = os.environ.get('JOURNAL_TRACE_FILE', '')
+ENABLED = os.environ.get('JOURNAL_TRACE', '') not in ('', '0') or TRACE_FILE != ''
+
+lock = threading.Lock()
+# span name -> [calls, total seconds, longest seconds]
+spans = {}
+# counter name -> value
+counters = {}
+# Chrome trace events, only kept when writing a trace file
+events = []
+# thread id -> name, for the trace
+threads = {}
+EPOCH = time.perf_counter()
+
+
+def traced(name):
+    """Decorate a function to record each call as a span called `name`.
+    When tracing is disabled the function is returned as it is, costing nothing."""
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, start, time.perf_counter())
+        return wrapper
+    return decorate
+
+
+class Span:
+    """A context manager recording the time spent in its block."""
+
+    def __init__(self, name):
+        """Initialization."""
+        self.name = name
+        self.start = None
+
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, *_):
+        record(self.name, self.start, time.perf_counter())
+
+
+NO_SPAN = nullcontext()
+
+
+def span(name):
+    """Get a context manager recording its block as a span called `name`,
+    or one that does nothing when tracing is disabled."""
+    return Span(name) if ENABLED else NO_SPAN
+
+
+def count(name, value=1):
+    """Add `value` to the counter called `name`."""
+    if ENABLED:
+        with lock:
+            counters[name] = counters.get(name, 0) + value
+
+
+def record(name, start, end):
+    """Record a span that ran from `start` to `end`, in perf_counter seconds."""
+    duration = end - start
+    thread = threading.get_native_id()
+    with lock:
+        totals = spans.get(name)
+        if totals is None:
+            spans[name] = [1, duration, duration]
+        else:
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+        if TRACE_FILE:
+            if thread not in threads:
+                threads[thread] = threading.current_thread().name
+            events.append({'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': thread,
+                           'ts': (start - EPOCH) * 1e6, 'dur': duration * 1e6})
+
+
+def summary(file=sys.stderr):
+    """Print a table of the spans, most total time first, and the counters."""
+    with lock:
+        rows = sorted(spans.items(), key=lambda item: item[1][1], reverse=True)
+        values = sorted(counters.items())
+    width = max([len(name) for name, _ in rows + values] + [4])
+    print(f'{"span":<{width}} {"calls":>9} {"total ms":>11} {"mean ms":>10} {"max ms":>10}', file=file)
+    for name, (calls, total, longest) in rows:
+        print(f'{name:<{width}} {calls:>9} {total * 1e3:>11.2f} {total / calls * 1e3:>10.3f} {longest * 1e3:>10.3f}',
+              file=file)
+    if values:
+        print(f'\n{"counter":<{width}} {"value":>9}', file=file)
+        for name, value in values:
+            print(f'{name:<{width}} {value:>9}', file=file)
+
+
+def write_trace(file_path):
+    """Write the spans recorded so far as a Chrome trace JSON file."""
+    with lock:
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': thread, 'args': {'name': name}}
+                    for thread, name in threads.items()]
+        trace = {'traceEvents': metadata + events, 'displayTimeUnit': 'ms',
+                 'otherData': {'counters': dict(counters)}}
+    with open(file_path, 'wt', encoding='UTF-8') as file:
+        json.dump(trace, file)
+
+
+def finish():
+    """Report at exit."""
+    summary()
+    if TRACE_FILE:
+        write_trace(TRACE_FILE)
+        print(f'trace written to {TRACE_FILE}', file=sys.stderr)
+
+
+if ENABLED:
+    atexit.register(finish)
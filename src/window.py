@@ -20,21 +20,29 @@ The main application window.
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
+# the crypto and storage modules are imported on first use, see warm_imports
+# pylint: disable=import-outside-toplevel
 import os
-import base64
+import time
+import datetime
+import hashlib
+import threading
+import importlib
+from functools import partial
 import gi
-import jprops
 
 gi.require_version('Adw', '1')
 gi.require_version('Gtk', '4.0')
 
 from gi.repository import Gtk, Gio, Adw
 from gi.repository import GLib
-from cryptography.fernet import Fernet, InvalidToken
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives import hashes
-from sortedcontainers import SortedDict
+from . import startup
+from .tracing import traced
+from .importer import IMPORT_APPEND, IMPORT_REPLACE, IMPORT_SKIP, find_files, read_files, read_jsonl
+from .saver import BackgroundSaver
+
+# modules not needed until a journal is created or opened
+DEFERRED_IMPORTS = ('cryptography.fernet', '.core', '.editlog', '.search', '.stats', '.storage')
 
 
 @Gtk.Template(resource_path='/ca/footeware/py/journal/window.ui')
@@ -65,6 +73,34 @@ class JournalWindow(Adw.ApplicationWindow):
     last_button = Gtk.Template.Child()
     textview = Gtk.Template.Child()
     save_button = Gtk.Template.Child()
+    search_button = Gtk.Template.Child()
+    search_bar = Gtk.Template.Child()
+    search_entry = Gtk.Template.Child()
+    search_results_window = Gtk.Template.Child()
+    search_results = Gtk.Template.Child()
+    task_box = Gtk.Template.Child()
+    task_progress = Gtk.Template.Child()
+    task_cancel_button = Gtk.Template.Child()
+    stats_page_box = Gtk.Template.Child()
+    stats_totals = Gtk.Template.Child()
+    stats_months = Gtk.Template.Child()
+
+    # seconds to wait for a background save when the window closes
+    SAVE_TIMEOUT = 5
+    # milliseconds without typing before the buffer is compared with the saved text
+    CHANGE_CHECK_DELAY = 300
+    # most search results listed
+    SEARCH_LIMIT = 20
+    # months listed on the statistics page, latest first
+    STATS_MONTHS = 24
+    # characters of an entry above which it is loaded into the editor in idle-time
+    # chunks, the start first, so a huge entry does not stall the window
+    CHUNKED_LOAD_THRESHOLD = 256 * 1024
+    LOAD_CHUNK = 64 * 1024
+    # milliseconds from an edit until it is written to the edit log
+    EDIT_LOG_DELAY = 1000
+    # milliseconds for writes to the journal file by another program to settle
+    EXTERNAL_CHANGE_DELAY = 500
 
 
     def __init__(self, **kwargs):
@@ -89,16 +125,53 @@ class JournalWindow(Adw.ApplicationWindow):
         # textview
         self.buffer = self.textview.get_buffer()
         self.buffer.connect("changed", self.on_buffer_changed)
+        self.buffer.connect("insert-text", self.on_buffer_insert_text)
+        self.buffer.connect("delete-range", self.on_buffer_delete_range)
+
+        # search
+        self.search_bar.connect_entry(self.search_entry)
+        self.search_entry.connect("search-changed", self.on_search_changed)
+        self.search_results.connect("row-activated", self.on_search_result_activated)
+
+        # long operations: import, change password
+        self.task_cancel_button.connect("clicked", self.on_task_cancel_clicked)
+        self.task_cancelled = threading.Event()
 
         # Connect to close-request signal to handle window closing
         self.connect("close-request", self.on_close_request)
 
+        # first frame, see on_map
+        self.connect("map", self.on_map)
+        self.first_paint_id = None
+
         self.journal = None
         self.date = self.calendar.get_date()
         self.properties = {}
         self.file_path = ''
         self.old_date = None
         self.password = None
+        self.saver = None
+        self.search_index = None
+        # {date: row} of the listed search results, and a count of the searches made,
+        # so snippets read for an earlier search are not shown, see on_search_changed
+        self.search_rows = {}
+        self.search_generation = 0
+        self.stats = None
+        # rows of the statistics page, see show_statistics
+        self.stats_rows = []
+        # change tracking of the editor, see on_buffer_changed
+        self.loading = False
+        self.saved_length = 0
+        self.saved_digest = self.digest('')
+        self.change_check_id = None
+        self.load_id = None
+        # crash recovery of unsaved edits, see start_edit_log
+        self.edit_log = None
+        self.edit_date = None
+        self.edit_log_flush_id = None
+        # changes to the journal file made elsewhere, see start_file_monitor
+        self.file_monitor = None
+        self.external_change_id = None
 
 
     def create_actions(self):
@@ -169,12 +242,65 @@ class JournalWindow(Adw.ApplicationWindow):
         last_action.connect("activate", self.on_last_action)
         self.add_action(last_action)
 
+        # Search action
+        search_action = Gio.SimpleAction.new("search", None)
+        search_action.connect("activate", self.on_search_action)
+        self.get_application().set_accels_for_action("win.search", ['<control>f'])
+        self.add_action(search_action)
+
+        # Import actions
+        import_folder_action = Gio.SimpleAction.new("import_folder", None)
+        import_folder_action.connect("activate", self.on_import_folder_action)
+        self.add_action(import_folder_action)
+        import_file_action = Gio.SimpleAction.new("import_file", None)
+        import_file_action.connect("activate", self.on_import_file_action)
+        self.add_action(import_file_action)
+
+        # Change password action
+        change_password_action = Gio.SimpleAction.new("change_password", None)
+        change_password_action.connect("activate", self.on_change_password_action)
+        self.add_action(change_password_action)
+
+        # Statistics action
+        statistics_action = Gio.SimpleAction.new("statistics", None)
+        statistics_action.connect("activate", self.on_statistics_action)
+        self.add_action(statistics_action)
+
+
+    def on_map(self, _):
+        """Watch for the first frame of the window."""
+        if self.first_paint_id is None:
+            self.first_paint_id = self.get_frame_clock().connect("after-paint", self.on_first_paint)
+
+
+    def on_first_paint(self, frame_clock):
+        """Once the first frame is drawn, load the deferred modules in the background."""
+        frame_clock.disconnect(self.first_paint_id)
+        startup.mark('first frame')
+        threading.Thread(target=self.warm_imports, name='journal-imports', daemon=True).start()
+        if startup.EXIT_AFTER_FIRST_FRAME:
+            GLib.idle_add(self.close)
+
+
+    @staticmethod
+    def warm_imports():
+        """Import the modules needed to create or open a journal, so they are
+        ready by the time the user has chosen one and typed the password."""
+        start = time.monotonic()
+        for name in DEFERRED_IMPORTS:
+            importlib.import_module(name, __package__)
+        startup.report('deferred imports', time.monotonic() - start)
+
 
     def on_back_action(self, _, __):
         """Respond to the Back button being clicked."""
         self.back_button.set_sensitive(False)
         self.back_button.set_visible(False)
-        self.stack.set_visible_child(self.new_open_page_box)
+        if self.journal is not None:
+            # back from the statistics page
+            self.stack.set_visible_child(self.editor_page_box)
+        else:
+            self.stack.set_visible_child(self.new_open_page_box)
 
 
     def on_new_journal_action(self, _, __):
@@ -191,56 +317,36 @@ class JournalWindow(Adw.ApplicationWindow):
         self.back_button.set_visible(True)
 
 
+    @traced('ui.navigate')
     def on_first_action(self, _, __):
         """Respond to the First button being clicked."""
         if self.journal is not None:
-            keys = self.journal.get_keys()
-            if len(keys) > 0:
-                first = sorted(list(keys))[0]
+            first = self.journal.first()
+            if first is not None:
                 date = self.date_from_str(first)
                 self.calendar.select_day(date)
                 self.mark_calendar_days()
 
 
+    @traced('ui.navigate')
     def on_previous_action(self, _, __):
         """Respond to the Previous button being clicked."""
         if self.journal is not None:
-            current_date = self.calendar.get_date()
-            current_date_str = current_date.format('%Y-%m-%d')
-            keys = sorted(list(self.journal.get_keys()))
-            # find index of currently selected date, if exists, then find previous item
-            previous_key = None
-            try:
-                current_index = list(keys).index(current_date_str)
-                if current_index - 1 >= 0:
-                    previous_key_index = current_index - 1
-                    previous_key = list(keys)[previous_key_index]
-            except ValueError:
-                # current date has no entry
-                pass
-            # no entry for selected date
+            current_date_str = self.calendar.get_date().format('%Y-%m-%d')
+            # nearest earlier entry, whether or not the selected date has one
+            previous_key = self.journal.prev(current_date_str)
             if previous_key is None:
-                # if selected date is before last entry, display last entry
-                if len(keys) > 0:
-                    last_key = list(self.journal.get_keys())[0]
-                    if current_date_str < last_key: # we don't care if it's >
-                        previous_key = last_key
-                    else:
-                        # If selected date has no entry and is between two entries,
-                        # select earlier one. Find next lower entry:
-                        copy = list(keys).copy()
-                        copy.reverse() # easier to go thru keys reversed
-                        for key in list(copy):
-                            if current_date_str > key:
-                                # previous key is lower entry
-                                previous_key = copy[copy.index(key)]
-                                break
+                # if selected date is before first entry, display first entry
+                first_key = self.journal.first()
+                if first_key is not None and current_date_str < first_key:
+                    previous_key = first_key
             if previous_key is not None:
                 date = self.date_from_str(previous_key)
                 self.calendar.select_day(date)
                 self.mark_calendar_days()
 
 
+    @traced('ui.navigate')
     def on_today_action(self, _, __):
         """Respond to request to navigate to 'today' in calendar."""
         if self.journal is not None:
@@ -249,52 +355,25 @@ class JournalWindow(Adw.ApplicationWindow):
             self.mark_calendar_days()
 
 
+    @traced('ui.navigate')
     def on_next_action(self, _, __):
         """Respond to the Next button being clicked."""
-        if self.journal is not None and len(self.journal.get_entries()) > 0:
-            current_date = self.calendar.get_date()
-            current_date_str = current_date.format('%Y-%m-%d')
-            keys = sorted(list(self.journal.get_keys()))
-            # find index of currently selected date, if exists, then find next item
-            next_key = None
-            try:
-                current_index = list(keys).index(current_date_str)
-                if current_index + 1 < len(keys):
-                    next_key_index = current_index + 1
-                    next_key = list(keys)[next_key_index]
-            except ValueError:
-                # current date has no entry
-                pass
-            # no entry for selected date
-            if next_key is None:
-                # if selected date is before first entry, display first entry
-                first_key = list(self.journal.get_keys())[0]
-                if current_date_str < first_key: # we don't care if it's >
-                    next_key = first_key
-                else:
-                    # if selected date has no entry and is between two entries, select later one
-                    upper_entry = None
-                    copy = list(keys).copy()
-                    copy.reverse()
-                    for key in list(copy): # entries are in SortedDict (low to high)
-                        if key < current_date_str:
-                            # previous key is next higher entry
-                            upper_entry = copy[copy.index(key) - 1]
-                            break
-                    if upper_entry is not None:
-                        next_key = upper_entry
+        if self.journal is not None:
+            current_date_str = self.calendar.get_date().format('%Y-%m-%d')
+            # nearest later entry, whether or not the selected date has one
+            next_key = self.journal.next(current_date_str)
             if next_key is not None:
                 date = self.date_from_str(next_key)
                 self.calendar.select_day(date)
                 self.mark_calendar_days()
 
 
+    @traced('ui.navigate')
     def on_last_action(self, _, __):
         """Respond to the Last button being clicked."""
         if self.journal is not None:
-            keys = self.journal.get_keys()
-            if len(keys) > 0:
-                last = sorted(list(keys))[len(keys) - 1]
+            last = self.journal.last()
+            if last is not None:
                 date = self.date_from_str(last)
                 self.calendar.select_day(date)
                 self.mark_calendar_days()
@@ -314,14 +393,10 @@ class JournalWindow(Adw.ApplicationWindow):
             self.mark_calendar_days()
             self.date = calendar.get_date()
             selected_date_str = self.date.format('%Y-%m-%d')
-            buffer = self.textview.get_buffer()
             if selected_date_str in self.journal.get_keys():
-                journal_entry = self.journal.get_entry(selected_date_str)
-                buffer.set_text(journal_entry)
+                self.load_buffer(self.journal.get_entry(selected_date_str))
             else:
-                buffer.set_text('')
-            buffer.set_modified(False)
-            self.add_title_prefix(False)
+                self.load_buffer('')
 
 
     def on_next_month(self, calendar):
@@ -330,14 +405,10 @@ class JournalWindow(Adw.ApplicationWindow):
             self.mark_calendar_days()
             self.date = calendar.get_date()
             selected_date_str = self.date.format('%Y-%m-%d')
-            buffer = self.textview.get_buffer()
             if selected_date_str in self.journal.get_keys():
-                journal_entry = self.journal.get_entry(selected_date_str)
-                buffer.set_text(journal_entry)
+                self.load_buffer(self.journal.get_entry(selected_date_str))
             else:
-                buffer.set_text('')
-            buffer.set_modified(False)
-            self.add_title_prefix(False)
+                self.load_buffer('')
 
 
     def on_prev_year(self, calendar):
@@ -346,14 +417,10 @@ class JournalWindow(Adw.ApplicationWindow):
             self.mark_calendar_days()
             self.date = calendar.get_date()
             selected_date_str = self.date.format('%Y-%m-%d')
-            buffer = self.textview.get_buffer()
             if selected_date_str in self.journal.get_keys():
-                journal_entry = self.journal.get_entry(selected_date_str)
-                buffer.set_text(journal_entry)
+                self.load_buffer(self.journal.get_entry(selected_date_str))
             else:
-                buffer.set_text('')
-            buffer.set_modified(False)
-            self.add_title_prefix(False)
+                self.load_buffer('')
 
 
     def on_next_year(self, calendar):
@@ -362,16 +429,13 @@ class JournalWindow(Adw.ApplicationWindow):
             self.mark_calendar_days()
             self.date = calendar.get_date()
             selected_date_str = self.date.format('%Y-%m-%d')
-            buffer = self.textview.get_buffer()
             if selected_date_str in self.journal.get_keys():
-                journal_entry = self.journal.get_entry(selected_date_str)
-                buffer.set_text(journal_entry)
+                self.load_buffer(self.journal.get_entry(selected_date_str))
             else:
-                buffer.set_text('')
-            buffer.set_modified(False)
-            self.add_title_prefix(False)
+                self.load_buffer('')
 
 
+    @traced('ui.day_selected')
     def on_day_selected(self, calendar):
         """React to a new day being selected in the calendar."""
         if self.journal is not None:
@@ -395,34 +459,33 @@ class JournalWindow(Adw.ApplicationWindow):
                 dialog.show()
             else:
                 if self.journal.contains_key(self.date):
-                    journal_entry = self.journal.get_entry(self.date)
-                    self.textview.get_buffer().set_text(journal_entry)
+                    self.load_buffer(self.journal.get_entry(self.date))
                 else:
                     # key not found; date not in journal, clear editor
-                    self.textview.get_buffer().set_text('')
+                    self.load_buffer('')
 
 
     def on_save_journal_dialog_response(self, _, response):
         """Respond to request to save current-1 journal entry."""
         if self.journal is not None:
             buffer = self.textview.get_buffer()
-            if response == "save":
+            # a partly loaded entry is never saved over the whole one, nor reverted
+            if response == "save" and not self.loading:
                 # update self.journal entry and save to file
                 start_iter = buffer.get_start_iter()
                 end_iter = buffer.get_end_iter()
                 journal_entry = buffer.get_text(start_iter, end_iter, True)
-                self.journal.add_entry(self.old_date, journal_entry) # saves
+                self.journal.add_entry(self.old_date, journal_entry, save=False)
+                self.saver.request()
                 self.mark_calendar_days()
-                self.toaster.add_toast(Adw.Toast.new("Journal saved"))
+            elif not self.loading and self.edit_log is not None:
+                self.edit_log.revert(self.edit_date)
             selected_date = self.calendar.get_date()
             selected_date_str = selected_date.format('%Y-%m-%d')
             if selected_date_str in self.journal.get_keys():
-                journal_entry = self.journal.get_entry(selected_date_str)
-                buffer.set_text(journal_entry)
+                self.load_buffer(self.journal.get_entry(selected_date_str))
             else:
-                buffer.set_text('')
-            buffer.set_modified(False)
-            self.add_title_prefix(False)
+                self.load_buffer('')
 
 
     def on_new_browse_for_folder_action(self, _, __):
@@ -460,28 +523,37 @@ class JournalWindow(Adw.ApplicationWindow):
     def on_create_journal_dialog_complete(self, file_path, _):
         """Complete journal creation process by enabling widgets,
         setting subtitle and setting focus in textview."""
-        self.journal = Journal(file_path, self.password)
+        from .core import Journal
+        from .storage import LogFormat
+        start = time.monotonic()
+        self.journal = Journal(file_path, self.password, lazy=True, storage_format=LogFormat)
+        self.start_saver()
+        self.start_search_index()
+        self.start_statistics()
         self.date = self.calendar.get_date()
         self.textview.grab_focus()
         # clear textview
-        self.textview.get_buffer().set_text('')
-        self.textview.get_buffer().set_modified(False)
+        self.load_buffer('')
         self.window_title.set_subtitle(self.file_path)
         self.back_button.set_sensitive(False)
         self.back_button.set_visible(False)
         self.stack.set_visible_child(self.editor_page_box)
+        self.start_edit_log(recover=False)
+        self.start_file_monitor()
+        startup.report('unlock', time.monotonic() - start)
+        startup.mark('unlocked editor')
 
 
     def on_open_browse_for_journal_action(self, _, __):
         """Respond to request to browse to an existing journal."""
         dialog = Gtk.FileDialog()
-        dialog.open_text_file(self, None, self.on_open_file_select)
+        dialog.open(self, None, self.on_open_file_select)
 
 
     def on_open_file_select(self, dialog, result):
         """Respond to a file being selected in Open dialog."""
         try:
-            file, _ = dialog.open_text_file_finish(result)
+            file = dialog.open_finish(result)
             self.existing_journal_location.set_label(file.get_path())
             self.existing_journal_password.grab_focus()
         except GLib.GError:
@@ -490,70 +562,587 @@ class JournalWindow(Adw.ApplicationWindow):
 
 
     def on_open_journal_action(self, _, __):
-        """Respond to request to open a journal."""
+        """Respond to request to open a journal by opening it on a worker thread,
+        so the window stays responsive and the opening can be cancelled."""
         file_path = self.existing_journal_location.get_label()
-        self.password = self.existing_journal_password.get_text()
-        if file_path != 'Browse' and file_path != '' and self.password != '':
+        password = self.existing_journal_password.get_text()
+        if file_path != 'Browse' and file_path != '' and password != '':
+            if self.start_task('Checking password…', True):
+                threading.Thread(target=self.run_open_journal, args=(file_path, password, time.monotonic()),
+                                 name='journal-open').start()
+
+
+    def run_open_journal(self, file_path, password, start):
+        """Open a journal. Runs on a worker thread, reporting back through the main loop."""
+        from .core import Journal
+        from .storage import LogFormat
+        journal = None
+        error = None
+        try:
+            journal = Journal(file_path, password, lazy=True, storage_format=LogFormat,
+                              progress=partial(GLib.idle_add, self.on_task_progress, 'Reading…'),
+                              cancelled=self.task_cancelled.is_set)
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            error = ex
+        GLib.idle_add(self.on_journal_opened, journal, error, file_path, password, start)
+
+
+    def on_journal_opened(self, journal, error, file_path, password, start):
+        """Show the opened journal, or why it could not be opened, called on the main loop."""
+        from cryptography.fernet import InvalidToken
+        from .core import Cancelled
+        self.task_box.set_visible(False)
+        if isinstance(error, InvalidToken):
+            self.toaster.add_toast(Adw.Toast.new("'InvalidToken' error. Is the password correct?"))
+        elif isinstance(error, Cancelled) or (error is None and self.task_cancelled.is_set()):
+            self.toaster.add_toast(Adw.Toast.new("Opening cancelled"))
+        elif error is not None:
+            self.toaster.add_toast(Adw.Toast.new(str(error)))
+        else:
+            self.password = password
+            self.journal = journal
+            self.start_saver()
+            self.start_search_index()
+            self.start_statistics()
+            self.mark_calendar_days()
+            self.date = self.calendar.get_date()
+            self.textview.grab_focus()
+            # load today's journal entry if exists
             try:
-                self.journal = Journal(file_path, self.password)
-                self.mark_calendar_days()
-                self.date = self.calendar.get_date()
-                self.textview.grab_focus()
-                # load today's journal entry if exists
-                try:
-                    journal_entry = self.journal.get_entry(self.calendar.get_date())
-                    self.textview.get_buffer().set_text(journal_entry)
-                except KeyError:
-                    # no entry for today
-                    pass
-                self.textview.get_buffer().set_modified(False)
-                self.window_title.set_subtitle(file_path)
-                self.back_button.set_sensitive(False)
-                self.back_button.set_visible(False)
-                self.stack.set_visible_child(self.editor_page_box)
-            except InvalidToken:
-                self.toaster.add_toast(Adw.Toast.new("'InvalidToken' error. Is the password correct?"))
+                self.load_buffer(self.journal.get_entry(self.calendar.get_date()))
+            except KeyError:
+                # no entry for today
+                self.load_buffer('')
+            self.window_title.set_subtitle(file_path)
+            self.back_button.set_sensitive(False)
+            self.back_button.set_visible(False)
+            self.stack.set_visible_child(self.editor_page_box)
+            self.start_edit_log()
+            self.start_file_monitor()
+            startup.report('unlock', time.monotonic() - start)
+            startup.mark('unlocked editor')
+        return GLib.SOURCE_REMOVE
+
+
+    def start_search_index(self):
+        """Load the journal's search index on a worker thread, from its sidecar file
+        where valid and by indexing the remaining entries otherwise."""
+        from .search import IndexSidecar, SearchIndex
+        self.search_index = SearchIndex()
+        self.journal.add_listener(self.search_index.update)
+        sidecar = IndexSidecar(self.journal, self.search_index)
+        threading.Thread(target=self.load_search_index, args=(sidecar,), daemon=True).start()
+        self.search_button.set_visible(True)
+
+
+    def load_search_index(self, sidecar):
+        """Fill the search index from `sidecar` and keep the sidecar current."""
+        self.journal.add_save_listener(sidecar.store)
+        stale = sidecar.load()
+        self.search_index.build(self.journal.iter_entries(stale))
+        if stale:
+            sidecar.store(stale)
+
+
+    def start_statistics(self):
+        """Load the journal's writing statistics on a worker thread, from their sidecar
+        file where valid and by counting the remaining entries otherwise."""
+        from .stats import JournalStats, StatsSidecar
+        self.stats = JournalStats()
+        self.journal.add_listener(self.stats.update)
+        sidecar = StatsSidecar(self.journal, self.stats)
+        threading.Thread(target=self.load_statistics, args=(sidecar,), daemon=True).start()
+
+
+    def load_statistics(self, sidecar):
+        """Fill the statistics from `sidecar` and keep the sidecar current."""
+        self.journal.add_save_listener(sidecar.store)
+        stale = sidecar.load()
+        self.stats.build(self.journal.iter_entries(stale))
+        if stale:
+            sidecar.store(stale)
+        GLib.idle_add(self.refresh_statistics)
+
+
+    def on_statistics_action(self, _, __):
+        """Respond to request to show the journal's writing statistics."""
+        if self.journal is not None and self.stats is not None:
+            self.show_statistics()
+            self.stack.set_visible_child(self.stats_page_box)
+            self.back_button.set_sensitive(True)
+            self.back_button.set_visible(True)
+
+
+    def refresh_statistics(self):
+        """Show the statistics again if their page is showing, e.g. once they are loaded."""
+        if self.stats is not None and self.stack.get_visible_child() == self.stats_page_box:
+            self.show_statistics()
+        return GLib.SOURCE_REMOVE
+
+
+    @traced('ui.statistics')
+    def show_statistics(self):
+        """Fill the statistics page from self.stats."""
+        for group, row in self.stats_rows:
+            group.remove(row)
+        self.stats_rows = []
+        summary = self.stats.summary()
+        first_last = f"{summary['first']} to {summary['last']}" if summary['entries'] else 'No entries yet'
+        totals = [
+            ('Entries', f"{summary['entries']:,}", first_last),
+            ('Words', f"{summary['words']:,}", f"{summary['characters']:,} characters"),
+            ('Words per entry', f"{summary['mean_words']:,}", None),
+            ('Words per day', f"{summary['words_per_day']:,}", 'Since the first entry'),
+            ('Current streak', self.days(summary['current_streak']), 'Days in a row up to today'),
+            ('Longest streak', self.days(summary['longest_streak']), None),
+        ]
+        for title, value, subtitle in totals:
+            self.add_stats_row(self.stats_totals, title, value, subtitle)
+        for year, month, entries, words, _ in self.stats.by_month()[:self.STATS_MONTHS]:
+            title = datetime.date(year, month, 1).strftime('%B %Y')
+            subtitle = f"{entries} {'entry' if entries == 1 else 'entries'}"
+            self.add_stats_row(self.stats_months, title, f'{words:,} words', subtitle)
+
+
+    def add_stats_row(self, group, title, value, subtitle):
+        """Add a row showing `value` to a group of the statistics page."""
+        row = Adw.ActionRow(title=title, use_markup=False)
+        if subtitle is not None:
+            row.set_subtitle(subtitle)
+        row.add_suffix(Gtk.Label(label=value, css_classes=['numeric']))
+        group.add(row)
+        self.stats_rows.append((group, row))
+
+
+    @staticmethod
+    def days(count):
+        """Get `count` as a number of days."""
+        return f"{count:,} {'day' if count == 1 else 'days'}"
+
+
+    def on_search_action(self, _, __):
+        """Respond to request to search the journal."""
+        if self.journal is not None:
+            self.search_bar.set_search_mode(True)
+            self.search_entry.grab_focus()
+
+
+    @traced('ui.search')
+    def on_search_changed(self, entry):
+        """List the entries matching the search text, best first. Their snippets are
+        read on a worker thread, so typing never waits on decrypting entries."""
+        self.search_results.remove_all()
+        self.search_rows = {}
+        self.search_generation += 1
+        query = entry.get_text().strip()
+        results = []
+        if self.search_index is not None and query != '':
+            results = self.search_index.search(query, self.SEARCH_LIMIT)
+        for key, _ in results:
+            row = Adw.ActionRow(title=key, use_markup=False, activatable=True)
+            row.date_key = key
+            self.search_results.append(row)
+            self.search_rows[key] = row
+        self.search_results_window.set_visible(len(results) > 0)
+        if results:
+            threading.Thread(target=self.read_snippets, args=(self.journal, list(self.search_rows),
+                                                              self.search_generation), daemon=True).start()
+
+
+    def read_snippets(self, journal, keys, generation):
+        """Get the first line of the entry of each of `keys`, shortened, for the search
+        results of `generation`. Runs on a worker thread; `iter_entries` leaves the
+        entry cache as navigation left it."""
+        snippets = {key: text.strip().split('\n', 1)[0][:80] for key, text in journal.iter_entries(keys)}
+        GLib.idle_add(self.show_snippets, snippets, generation)
+
+
+    def show_snippets(self, snippets, generation):
+        """Show the {date: snippet} of `snippets` under the search results, unless
+        a later search has replaced them."""
+        if generation == self.search_generation:
+            for key, snippet in snippets.items():
+                self.search_rows[key].set_subtitle(snippet)
+        return GLib.SOURCE_REMOVE
+
+
+    def on_search_result_activated(self, _, row):
+        """Show the entry of the chosen search result."""
+        self.calendar.select_day(self.date_from_str(row.date_key))
+        self.mark_calendar_days()
+
+
+    def on_import_folder_action(self, _, __):
+        """Respond to request to import a folder of dated notes."""
+        if self.journal is not None:
+            dialog = Gtk.FileDialog()
+            dialog.select_folder(self, None, self.on_import_folder_select)
 
 
+    def on_import_folder_select(self, dialog, result):
+        """Respond to a folder being chosen to import."""
+        try:
+            folder = dialog.select_folder_finish(result)
+            self.choose_import_policy(folder.get_path())
+        except GLib.GError:
+            # user cancelled or backend error
+            pass
+
+
+    def on_import_file_action(self, _, __):
+        """Respond to request to import a JSON Lines file."""
+        if self.journal is not None:
+            dialog = Gtk.FileDialog()
+            dialog.open(self, None, self.on_import_file_select)
+
+
+    def on_import_file_select(self, dialog, result):
+        """Respond to a JSON Lines file being chosen to import."""
+        try:
+            file = dialog.open_finish(result)
+            self.choose_import_policy(file.get_path())
+        except GLib.GError:
+            # user cancelled or backend error
+            pass
+
+
+    def choose_import_policy(self, source):
+        """Ask what to do with dates that already have an entry, unless the journal
+        is empty, then import `source`."""
+        if len(self.journal.get_keys()) == 0:
+            self.start_import(source, IMPORT_SKIP)
+            return
+        dialog = Adw.MessageDialog(
+            transient_for=self,
+            modal=True,
+            heading="Import entries",
+        )
+        dialog.set_body('What should happen to dates that already have an entry?')
+        dialog.add_response("cancel", "Cancel")
+        dialog.add_response(IMPORT_SKIP, "Keep")
+        dialog.add_response(IMPORT_APPEND, "Append")
+        dialog.add_response(IMPORT_REPLACE, "Replace")
+        dialog.set_default_response(IMPORT_SKIP)
+        dialog.set_close_response("cancel")
+        dialog.set_response_appearance(IMPORT_REPLACE, Adw.ResponseAppearance.DESTRUCTIVE)
+        dialog.connect("response", self.on_import_dialog_response, source)
+        dialog.show()
+
+
+    def on_import_dialog_response(self, _, response, source):
+        """Import with the chosen policy, unless cancelled."""
+        if response != "cancel":
+            self.start_import(source, response)
+
+
+    def start_import(self, source, policy):
+        """Import `source` on a worker thread, showing its progress."""
+        if self.start_task('Reading…', False):
+            # not a daemon, so an import under way at exit is still saved
+            threading.Thread(target=self.run_import, args=(source, policy), name='journal-import').start()
+
+
+    def run_import(self, source, policy):
+        """Read and merge the entries of `source` and save the journal once.
+        Runs on a worker thread, reporting back through the main loop."""
+        counts = None
+        error = None
+        try:
+            reading = partial(GLib.idle_add, self.on_task_progress, 'Reading…')
+            if os.path.isdir(source):
+                files, _ = find_files(source)
+                records = read_files(files, reading)
+            else:
+                records = read_jsonl(source, progress=reading)
+            encrypting = partial(GLib.idle_add, self.on_task_progress, 'Encrypting…')
+            counts = self.journal.import_entries(records, policy, encrypting)
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            error = ex
+        GLib.idle_add(self.on_import_finished, counts, error)
+
+
+    def on_import_finished(self, counts, error):
+        """Report the outcome of an import and show the imported entries, called on the main loop."""
+        self.task_box.set_visible(False)
+        if error is not None:
+            self.toaster.add_toast(Adw.Toast.new(str(error)))
+            return GLib.SOURCE_REMOVE
+        imported = counts['added'] + counts['replaced'] + counts['appended']
+        self.toaster.add_toast(Adw.Toast.new(f"Imported {imported} entries, kept {counts['skipped']}"))
+        self.mark_calendar_days()
+        if not self.has_unsaved_changes():
+            self.load_buffer(self.journal.get_entry(self.date) if self.journal.contains_key(self.date) else '')
+        return GLib.SOURCE_REMOVE
+
+
+    def on_change_password_action(self, _, __):
+        """Respond to request to change the journal's password."""
+        if self.journal is not None:
+            dialog = Adw.MessageDialog(
+                transient_for=self,
+                modal=True,
+                heading="Change password",
+            )
+            dialog.set_body('Every entry is re-encrypted with the new password.')
+            box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+            entries = []
+            for placeholder in ('Current password', 'New password', 'Confirm new password'):
+                entry = Gtk.PasswordEntry(placeholder_text=placeholder, show_peek_icon=True)
+                box.append(entry)
+                entries.append(entry)
+            dialog.set_extra_child(box)
+            dialog.add_response("cancel", "Cancel")
+            dialog.add_response("change", "Change")
+            dialog.set_default_response("change")
+            dialog.set_close_response("cancel")
+            dialog.set_response_appearance("change", Adw.ResponseAppearance.SUGGESTED)
+            dialog.connect("response", self.on_change_password_response, *entries)
+            dialog.show()
+
+
+    def on_change_password_response(self, _, response, current, new_1, new_2):
+        """Re-encrypt the journal with the new password on a worker thread, showing its progress."""
+        if response != "change":
+            return
+        current_password = current.get_text() # do not trim whitespace
+        new_password = new_1.get_text() # do not trim whitespace
+        if new_password == '':
+            self.toaster.add_toast(Adw.Toast.new("The new password is empty"))
+        elif new_password != new_2.get_text():
+            self.toaster.add_toast(Adw.Toast.new("Passwords don't match"))
+        elif self.start_task('Re-encrypting…', True):
+            # not a daemon, so the temporary file is removed even if the window closes
+            threading.Thread(target=self.run_change_password, args=(current_password, new_password),
+                             name='journal-rekey').start()
+
+
+    def run_change_password(self, current_password, new_password):
+        """Re-encrypt the journal. Runs on a worker thread, reporting back through the main loop."""
+        changed = False
+        error = None
+        try:
+            changed = self.journal.change_password(current_password, new_password,
+                                                   progress=partial(GLib.idle_add, self.on_rekey_progress),
+                                                   cancelled=self.task_cancelled.is_set)
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            error = ex
+        GLib.idle_add(self.on_change_password_finished, changed, error, new_password)
+
+
+    def on_rekey_progress(self, done, total):
+        """Show the progress of re-encryption, then of checking the result, called on the main loop."""
+        if done * 2 <= total:
+            return self.on_task_progress('Re-encrypting…', done, total)
+        return self.on_task_progress('Verifying…', done, total)
+
+
+    def on_change_password_finished(self, changed, error, new_password):
+        """Report the outcome of a password change, called on the main loop."""
+        self.task_box.set_visible(False)
+        if error is not None:
+            self.toaster.add_toast(Adw.Toast.new(str(error)))
+        elif changed:
+            self.password = new_password
+            self.toaster.add_toast(Adw.Toast.new("Password changed"))
+            # logged edits are under the old key, and the rewrite saved them
+            if self.edit_log is not None and not self.journal.dirty and not self.buffer.get_modified():
+                self.edit_log.discard()
+        else:
+            self.toaster.add_toast(Adw.Toast.new("Password change cancelled, the journal is unchanged"))
+        return GLib.SOURCE_REMOVE
+
+
+    def start_task(self, text, cancellable):
+        """Show the progress bar for a long operation, first saving the editor's text
+        so the operation sees it. Returns False if another operation is under way."""
+        if self.task_box.get_visible():
+            self.toaster.add_toast(Adw.Toast.new("Please wait for the current operation to finish"))
+            return False
+        self.save_current_entry()
+        self.task_cancelled.clear()
+        self.task_progress.set_fraction(0)
+        self.task_progress.set_text(text)
+        self.task_cancel_button.set_sensitive(True)
+        self.task_cancel_button.set_visible(cancellable)
+        self.task_box.set_visible(True)
+        return True
+
+
+    def on_task_progress(self, text, done, total):
+        """Show the progress of a long operation, called on the main loop."""
+        self.task_progress.set_text(text)
+        self.task_progress.set_fraction(done / total if total else 1)
+        return GLib.SOURCE_REMOVE
+
+
+    def on_task_cancel_clicked(self, button):
+        """Ask the running operation to stop."""
+        button.set_sensitive(False)
+        self.task_progress.set_text('Cancelling…')
+        self.task_cancelled.set()
+
+
+    @traced('ui.mark_calendar_days')
     def mark_calendar_days(self):
         """Read the journal and mark the calendar days for the month that are keys."""
         if self.journal is not None:
             self.calendar.clear_marks()
-            for key, value in self.journal.get_entries():
-                date = self.calendar.get_date()
-                if date.get_year() == int(key[:4]) and date.get_month() == int(key[5:7]) and value != '':
-                    self.calendar.mark_day(int(key[8:]))
+            date = self.calendar.get_date()
+            for day in self.journal.get_days(date.get_year(), date.get_month()):
+                self.calendar.mark_day(day)
 
 
     def on_save_journal_action(self, _, __):
         """Respond to request to save a journal."""
-        if self.journal is not None:
+        if self.journal is not None and not self.loading:
             if self.textview.get_buffer().get_modified():
                 buffer = self.textview.get_buffer()
                 journal_entry = buffer.get_text(buffer.get_start_iter(), buffer.get_end_iter(), True)
-                if journal_entry == '' and len(list(self.journal.get_keys())) == 0:
+                if journal_entry == '' and len(self.journal.get_keys()) == 0:
                     self.toaster.add_toast(Adw.Toast.new("Empty journal not saved."))
                 else:
-                    self.journal.add_entry(self.calendar.get_date(), journal_entry)
+                    self.journal.add_entry(self.calendar.get_date(), journal_entry, save=False)
+                    self.saver.request()
+                    self.set_saved_text(journal_entry)
                     self.mark_calendar_days()
                     buffer.set_modified(False)
                     self.window_title.set_title('Journal')
-                    self.toaster.add_toast(Adw.Toast.new("Journal saved"))
+
+
+    def on_journal_saved(self, error):
+        """Report the outcome of a background save, called on the main loop."""
+        if error is None:
+            self.toaster.add_toast(Adw.Toast.new("Journal saved"))
+            # the edit log is no longer needed once every edit is saved
+            if self.edit_log is not None and not self.journal.dirty and not self.buffer.get_modified():
+                self.edit_log.discard()
+        else:
+            self.toaster.add_toast(Adw.Toast.new(str(error)))
+        self.mark_calendar_days()
 
 
     def on_buffer_changed(self, buffer):
-        """Handle text buffer change by prepending an asterisk to the title."""
-        displayed_text = buffer.get_text(buffer.get_start_iter(), buffer.get_end_iter(), True)
-        self.date = self.calendar.get_date()
-        date_str = self.date.format('%Y-%m-%d')
-        if date_str in self.journal.get_keys():
-            journal_entry = self.journal.get_entry(self.date)
-            if displayed_text != journal_entry:
-                self.add_title_prefix(True)
-            else:
-                self.add_title_prefix(False)
+        """Handle text buffer change by prepending a dot to the title. A change of
+        length marks the buffer at once; otherwise the text is compared with the
+        saved text once typing pauses, so each keystroke costs the same."""
+        if self.loading:
+            return
+        if buffer.get_char_count() != self.saved_length:
+            self.add_title_prefix(True)
+        if self.change_check_id is not None:
+            GLib.source_remove(self.change_check_id)
+        self.change_check_id = GLib.timeout_add(self.CHANGE_CHECK_DELAY, self.check_buffer_changed)
+
+
+    def check_buffer_changed(self):
+        """Compare the buffer with the saved text, e.g. after an undo back to it."""
+        self.change_check_id = None
+        if self.loading:
+            return GLib.SOURCE_REMOVE
+        buffer = self.textview.get_buffer()
+        if buffer.get_char_count() != self.saved_length:
+            self.add_title_prefix(True)
+        else:
+            displayed_text = buffer.get_text(buffer.get_start_iter(), buffer.get_end_iter(), True)
+            self.add_title_prefix(self.digest(displayed_text) != self.saved_digest)
+        return GLib.SOURCE_REMOVE
+
+
+    def on_buffer_insert_text(self, _, location, text, __):
+        """Record an insertion in the edit log."""
+        if not self.loading and self.edit_log is not None:
+            self.edit_log.insert(self.edit_date, self.saved_digest, location.get_offset(), text)
+            self.schedule_edit_log_flush()
+
+
+    def on_buffer_delete_range(self, _, start, end):
+        """Record a deletion in the edit log."""
+        if not self.loading and self.edit_log is not None:
+            self.edit_log.delete(self.edit_date, self.saved_digest, start.get_offset(), end.get_offset())
+            self.schedule_edit_log_flush()
+
+
+    def schedule_edit_log_flush(self):
+        """Write the edits to the edit log shortly, batching those made meanwhile.
+        The timer is not pushed back by further typing, so steady typing is logged too."""
+        if self.edit_log_flush_id is None:
+            self.edit_log_flush_id = GLib.timeout_add(self.EDIT_LOG_DELAY, self.flush_edit_log)
+
+
+    def flush_edit_log(self):
+        """Hand the batched edits to the edit log's worker thread."""
+        self.edit_log_flush_id = None
+        if self.edit_log is not None:
+            self.edit_log.flush()
+        return GLib.SOURCE_REMOVE
+
+
+    @traced('ui.load_buffer')
+    def load_buffer(self, text):
+        """Show `text` in the editor as the saved entry of the selected date."""
+        buffer = self.textview.get_buffer()
+        self.set_saved_text(text)
+        self.edit_date = self.date.format('%Y-%m-%d')
+        if self.load_id is not None:
+            GLib.source_remove(self.load_id)
+            self.load_id = None
+        self.loading = True
+        # the text shown is the saved one, even before it is all loaded
+        self.add_title_prefix(False)
+        if len(text) <= self.CHUNKED_LOAD_THRESHOLD:
+            buffer.set_text(text)
+            self.finish_loading()
+        else:
+            # the start is what shows, the rest follows when the main loop is idle;
+            # the editor is read-only meanwhile so the partial text is never edited or saved
+            end = self.chunk_end(text, 0)
+            buffer.set_text(text[:end])
+            buffer.place_cursor(buffer.get_start_iter())
+            buffer.set_modified(False)
+            self.textview.set_editable(False)
+            self.load_id = GLib.idle_add(self.load_next_chunk, text, end, priority=GLib.PRIORITY_LOW)
+
+
+    def chunk_end(self, text, start):
+        """Get where the chunk of `text` from `start` ends, after a line break if there is one."""
+        return text.rfind('\n', start, start + self.LOAD_CHUNK) + 1 or min(start + self.LOAD_CHUNK, len(text))
+
+
+    @traced('ui.load_chunk')
+    def load_next_chunk(self, text, start):
+        """Append the next chunk of a large entry to the editor, called when idle."""
+        buffer = self.textview.get_buffer()
+        end = self.chunk_end(text, start)
+        buffer.begin_irreversible_action()
+        buffer.insert(buffer.get_end_iter(), text[start:end])
+        buffer.end_irreversible_action()
+        buffer.set_modified(False)
+        if end < len(text):
+            self.load_id = GLib.idle_add(self.load_next_chunk, text, end, priority=GLib.PRIORITY_LOW)
         else:
-            self.add_title_prefix(displayed_text != '')
+            self.load_id = None
+            self.finish_loading()
+        return GLib.SOURCE_REMOVE
+
+
+    def finish_loading(self):
+        """Resume change tracking and editing once the entry is wholly in the editor."""
+        self.loading = False
+        self.textview.set_editable(True)
+        self.textview.get_buffer().set_modified(False)
+        self.add_title_prefix(False)
+
+
+    def set_saved_text(self, text):
+        """Remember the length and digest of the saved text the buffer is compared with."""
+        self.saved_length = len(text)
+        self.saved_digest = self.digest(text)
+
+
+    @staticmethod
+    def digest(text):
+        """Get a digest of `text` for comparison without keeping a copy of it."""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
 
 
     def add_title_prefix(self, changed):
@@ -575,12 +1164,14 @@ class JournalWindow(Adw.ApplicationWindow):
 
     def save_current_entry(self):
         """Save the current journal entry."""
-        if self.journal is not None and self.textview.get_buffer().get_modified():
+        if self.journal is not None and not self.loading and self.textview.get_buffer().get_modified():
             buffer = self.textview.get_buffer()
             start_iter = buffer.get_start_iter()
             end_iter = buffer.get_end_iter()
             journal_entry = buffer.get_text(start_iter, end_iter, True)
-            self.journal.add_entry(self.date, journal_entry)
+            self.journal.add_entry(self.date, journal_entry, save=False)
+            self.saver.request()
+            self.set_saved_text(journal_entry)
             buffer.set_modified(False)
             self.window_title.set_title('Journal')
 
@@ -605,6 +1196,7 @@ class JournalWindow(Adw.ApplicationWindow):
             dialog.connect("response", self.on_close_dialog_response)
             dialog.show()
             return True  # Prevent close until user decides
+        self.close_journal()
         return False  # Allow close
 
 
@@ -612,12 +1204,13 @@ class JournalWindow(Adw.ApplicationWindow):
         """Handle response from close confirmation dialog."""
         if response == "save":
             # Save and close
-            if self.journal is not None:
+            if self.journal is not None and not self.loading:
                 buffer = self.textview.get_buffer()
                 start_iter = buffer.get_start_iter()
                 end_iter = buffer.get_end_iter()
                 journal_entry = buffer.get_text(start_iter, end_iter, True)
-                self.journal.add_entry(self.date, journal_entry)
+                self.journal.add_entry(self.date, journal_entry, save=False)
+                self.saver.request()
             self.force_close()
         elif response == "discard":
             # Close without saving
@@ -627,116 +1220,204 @@ class JournalWindow(Adw.ApplicationWindow):
 
     def force_close(self):
         """Force close the window by temporarily disconnecting the close-request handler."""
+        self.close_journal()
         # Disconnect the close-request handler to avoid recursion
         self.disconnect_by_func(self.on_close_request)
         # Now close the window
         self.close()
 
 
-class Journal:
-    """
-    A map where the keys are dates in the format %Y-%m-%d and
-    the values are encrypted textual entries.
-    """
+    def start_saver(self):
+        """Start saving self.journal in the background, replacing any previous saver."""
+        self.stop_saver()
+        self.saver = BackgroundSaver(self.journal, self.on_journal_saved, GLib.idle_add)
 
-    def __init__(self, file_path, password):
-        """Initialization."""
-        self.file_path = file_path
-        self.password = password
-        self.entries = {}
-        # load entries if any
-        try:
-            with open(file_path, 'rt', encoding='UTF-8') as file:
-                encrypted = jprops.load_properties(file, SortedDict)
-                for key, value in encrypted.items():
-                    decrypted_value = self.decrypt(value, self.password)
-                    self.entries[key] = decrypted_value
-        except FileNotFoundError:
-            pass  # No existing journal file
-
-
-    def save(self):
-        """Save all entries to file."""
-        self.prune_empty_values()
-        if len(self.get_keys()) == 0:
-            raise Exception("Empty journal not saved.")
-        with open(self.file_path, 'wt', encoding='UTF-8') as file:
-            encrypted = {}
-            for key, value in sorted(list(self.entries.items())):
-                encrypted_value = self.encrypt(value, self.password)
-                encrypted[key] = encrypted_value
-            jprops.store_properties(file, encrypted)
-
-
-    def prune_empty_values(self):
-        """Remove from self.entries those that have a blank value."""
-        keys_to_pop = []
-        for key, value in self.entries.items():
-            if value == '':
-                keys_to_pop.append(key)
-        for key in keys_to_pop:
-            self.entries.pop(key)
-
-
-    def add_entry(self, date, text):
-        """Add a new entry."""
-        date_str = date.format('%Y-%m-%d')
-        self.entries[date_str] = text
-        self.save()
-
-
-    def get_keys(self):
-        """Get all the dates in this journal."""
-        return self.entries.keys()
-
-
-    def get_entry(self, key):
-        """Get a date's entry.'"""
-        if isinstance(key, GLib.DateTime):
-            key = key.format('%Y-%m-%d')
-        return self.entries[key]
-
-
-    def get_entries(self):
-        """Get all entries in this journal."""
-        return self.entries.items()
-
-
-    def remove_entry(self, key):
-        """Remove an entry."""
-        if isinstance(key, GLib.DateTime):
-            key = key.format('%Y-%m-%d')
-        self.entries.pop(key)
-
-
-    def contains_key(self, key):
-        """Determines if the provided key is a key in self.entries."""
-        index = None
-        if isinstance(key, GLib.DateTime):
-            key = key.format('%Y-%m-%d')
-        try:
-            index = list(self.entries.keys()).index(key)
-            return index is not None
-        except ValueError:
-            # no entry for key
-            return False
+
+    def start_edit_log(self, recover=True):
+        """Start logging edits to self.journal, first offering to recover those of the
+        last session that were not saved, if `recover`."""
+        from .editlog import EditLog
+        self.stop_edit_log()
+        self.edit_log = EditLog(self.journal)
+        recovered = self.edit_log.recover() if recover else {}
+        if recovered:
+            dialog = Adw.MessageDialog(
+                transient_for=self,
+                modal=True,
+                heading="Recover unsaved edits?",
+            )
+            dialog.set_body(f'Edits to {", ".join(sorted(recovered))} were not saved before the journal '
+                            'was last closed. Do you want to recover them?')
+            dialog.add_response("discard", "Discard")
+            dialog.add_response("recover", "Recover")
+            dialog.set_default_response("recover")
+            dialog.set_close_response("recover")
+            dialog.set_response_appearance("discard", Adw.ResponseAppearance.DESTRUCTIVE)
+            dialog.set_response_appearance("recover", Adw.ResponseAppearance.SUGGESTED)
+            dialog.connect("response", self.on_recover_dialog_response, recovered)
+            dialog.show()
+        else:
+            self.edit_log.discard()
+
+
+    def on_recover_dialog_response(self, _, response, recovered):
+        """Put the recovered edits in the journal and save it, or discard them."""
+        if response == "recover":
+            for key, text in recovered.items():
+                self.journal.add_entry(key, text, save=False)
+            self.saver.request()
+            self.mark_calendar_days()
+            if self.edit_date in recovered:
+                self.load_buffer(recovered[self.edit_date])
+        else:
+            self.edit_log.discard()
 
 
-    def encrypt(self, plaintext, password):
-        """Encrypt the provided `plaintext` using provided `password`."""
-        if isinstance(plaintext, str):
-            plaintext = plaintext.encode("utf-8")
-        encrypted_bytes = self.cipher_fernet(password.encode("utf-8")).encrypt(plaintext)
-        return encrypted_bytes.decode("utf-8")
+    def start_file_monitor(self):
+        """Watch the journal file for changes made by another program, e.g. a file sync,
+        replacing any previous monitor."""
+        self.stop_file_monitor()
+        journal_file = Gio.File.new_for_path(self.journal.file_path)
+        self.file_monitor = journal_file.monitor_file(Gio.FileMonitorFlags.WATCH_MOVES, None)
+        self.file_monitor.connect("changed", self.on_journal_file_changed)
 
 
-    def decrypt(self, ciphertext, password):
-        """Decrypt the provided `ciphertext` using provided `password`."""
-        decrypted_bytes = self.cipher_fernet(password.encode("utf-8")).decrypt(ciphertext)
-        return decrypted_bytes.decode("utf-8")
+    def stop_file_monitor(self):
+        """Stop watching the journal file."""
+        if self.external_change_id is not None:
+            GLib.source_remove(self.external_change_id)
+            self.external_change_id = None
+        if self.file_monitor is not None:
+            self.file_monitor.cancel()
+            self.file_monitor = None
+
+
+    def on_journal_file_changed(self, _, __, ___, event):
+        """Check the journal file once writes to it settle. Saves made here are
+        reported too, and are told apart by `Journal.reload`."""
+        if event in (Gio.FileMonitorEvent.CHANGES_DONE_HINT, Gio.FileMonitorEvent.CREATED,
+                     Gio.FileMonitorEvent.MOVED_IN, Gio.FileMonitorEvent.RENAMED):
+            if self.external_change_id is not None:
+                GLib.source_remove(self.external_change_id)
+            self.external_change_id = GLib.timeout_add(self.EXTERNAL_CHANGE_DELAY, self.check_external_change)
+
+
+    def check_external_change(self):
+        """Merge in the entries changed in the journal file on a worker thread."""
+        self.external_change_id = None
+        if self.journal is not None:
+            threading.Thread(target=self.run_reload, args=(self.journal, self.password),
+                             name='journal-reload', daemon=True).start()
+        return GLib.SOURCE_REMOVE
+
+
+    def run_reload(self, journal, password):
+        """Reload `journal`. Runs on a worker thread, reporting back through the main loop."""
+        merged = []
+        conflicts = {}
+        error = None
+        try:
+            merged, conflicts = journal.reload(password)
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            error = ex
+        GLib.idle_add(self.on_journal_reloaded, journal, merged, conflicts, error)
+
+
+    def on_journal_reloaded(self, journal, merged, conflicts, error):
+        """Show the entries changed elsewhere, asking which to keep only if the entry
+        being edited was changed both here and there. Called on the main loop."""
+        from cryptography.fernet import InvalidToken
+        if journal is not self.journal:
+            # closed meanwhile
+            return GLib.SOURCE_REMOVE
+        if isinstance(error, InvalidToken):
+            self.toaster.add_toast(Adw.Toast.new("The journal was changed elsewhere with another password. "
+                                                 "Reopen it to see the changes."))
+        elif error is not None:
+            self.toaster.add_toast(Adw.Toast.new(str(error)))
+        if not merged and not conflicts:
+            return GLib.SOURCE_REMOVE
+        self.mark_calendar_days()
+        key = self.edit_date
+        if key in conflicts or (key in merged and self.textview.get_buffer().get_modified()):
+            if key in conflicts:
+                text = conflicts[key]
+            else:
+                text = self.journal.get_entry(key) if self.journal.contains_key(key) else None
+            dialog = Adw.MessageDialog(
+                transient_for=self,
+                modal=True,
+                heading="Entry changed elsewhere",
+            )
+            dialog.set_body(f'The entry for {key} was changed by another program while you were editing it. '
+                            'Keep your version, which replaces the other when saved, or use the other?')
+            dialog.add_response("theirs", "Use Other")
+            dialog.add_response("mine", "Keep Mine")
+            dialog.set_default_response("mine")
+            dialog.set_close_response("mine")
+            dialog.set_response_appearance("theirs", Adw.ResponseAppearance.DESTRUCTIVE)
+            dialog.set_response_appearance("mine", Adw.ResponseAppearance.SUGGESTED)
+            dialog.connect("response", self.on_conflict_dialog_response, key, text)
+            dialog.show()
+        elif key in merged:
+            self.load_buffer(self.journal.get_entry(key) if self.journal.contains_key(key) else '')
+        if merged:
+            self.toaster.add_toast(Adw.Toast.new(
+                f"Loaded {len(merged)} {'entry' if len(merged) == 1 else 'entries'} changed elsewhere"))
+        return GLib.SOURCE_REMOVE
+
+
+    def on_conflict_dialog_response(self, _, response, key, text):
+        """Replace the edited entry with the version changed elsewhere, or keep it."""
+        if response == "theirs" and self.journal is not None and key == self.edit_date:
+            text = text or ''
+            self.journal.add_entry(key, text, save=False)
+            if self.journal.dirty:
+                self.saver.request()
+            if self.edit_log is not None:
+                self.edit_log.revert(key)
+            self.load_buffer(text)
+            self.mark_calendar_days()
 
 
-    def cipher_fernet(self, password):
-        """Create a hairy little Fernet."""
-        key = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=b'abcd', iterations=1000, backend=default_backend()).derive(password)
-        return Fernet(base64.urlsafe_b64encode(key))
+    def stop_edit_log(self):
+        """Write or, if everything is saved, discard the edit log, then let its thread exit."""
+        if self.edit_log_flush_id is not None:
+            GLib.source_remove(self.edit_log_flush_id)
+            self.edit_log_flush_id = None
+        if self.edit_log is not None:
+            if not self.journal.dirty:
+                self.edit_log.discard()
+            self.edit_log.stop()
+            self.edit_log = None
+
+
+    def stop_saver(self):
+        """Wait a bounded time for pending saves, then let the saver thread exit."""
+        if self.saver is not None:
+            self.saver.flush(self.SAVE_TIMEOUT)
+            self.saver.stop()
+            self.saver = None
+
+
+    def close_journal(self):
+        """Stop the background work on the journal and forget what was kept for it,
+        cancelling the editor's pending timers. self.journal is left for callbacks
+        already queued."""
+        self.stop_saver()
+        self.stop_edit_log()
+        self.stop_file_monitor()
+        self.search_index = None
+        self.search_rows = {}
+        self.search_generation += 1
+        self.stats = None
+        # change tracking of the editor, see on_buffer_changed
+        if self.change_check_id is not None:
+            GLib.source_remove(self.change_check_id)
+            self.change_check_id = None
+        if self.load_id is not None:
+            GLib.source_remove(self.load_id)
+            self.load_id = None
+        self.loading = False
+        self.saved_length = 0
+        self.saved_digest = self.digest('')
@@ -0,0 +1,106 @@
+"""
+Tests replaying the edit log against the saved entries.
+
+Usage: python3 -m unittest discover tests
+"""
+
+# test_editlog.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import sys
+import tempfile
+import unittest
+import importlib.util
+
+# import the src directory as the journal package, as the benchmarks do
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+if 'journal' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('journal', os.path.join(SRC, '__init__.py'),
+                                                  submodule_search_locations=[SRC])
+    sys.modules['journal'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['journal'])
+
+# pylint: disable=wrong-import-position
+from journal.core import Journal
+from journal.editlog import EditLog, text_digest
+
+DATE = '2024-05-01'
+
+
+class EditLogRecoverTest(unittest.TestCase):
+    """Recovering the unsaved edits of a crashed session."""
+
+    def setUp(self):
+        """Make a journal holding 'hello' on DATE."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(os.path.join(self.directory.name, 'test.journal'), 'password')
+        self.journal.add_entry(DATE, 'hello')
+        self.log = EditLog(self.journal)
+
+
+    def tearDown(self):
+        """Stop the log's thread and remove the journal."""
+        self.log.stop()
+        self.log.thread.join()
+        self.directory.cleanup()
+
+
+    def recover(self):
+        """Write everything logged so far, then replay it as a new session would."""
+        self.log.stop()
+        self.log.thread.join()
+        return self.log.recover()
+
+
+    def test_batches_sharing_a_base_continue_each_other(self):
+        """Each batch flushed before a save starts from the text the last one made."""
+        base = text_digest('hello')
+        self.log.insert(DATE, base, 5, ' world')
+        self.log.flush()
+        self.log.insert(DATE, base, 11, '!')
+        self.log.flush()
+        self.log.delete(DATE, base, 0, 1)
+        self.assertEqual(self.recover(), {DATE: 'ello world!'})
+
+
+    def test_batches_after_an_editor_save_continue_the_replayed_text(self):
+        """A base that is the replayed text, saved in the editor but not to the journal, continues it."""
+        self.log.insert(DATE, text_digest('hello'), 5, ' world')
+        self.log.flush()
+        self.log.insert(DATE, text_digest('hello world'), 11, '!')
+        self.assertEqual(self.recover(), {DATE: 'hello world!'})
+
+
+    def test_batches_of_a_text_saved_over_are_skipped(self):
+        """Edits of a text no longer saved nor replayed are dropped."""
+        self.log.insert(DATE, text_digest('goodbye'), 0, 'oh ')
+        self.assertEqual(self.recover(), {})
+
+
+    def test_revert_drops_earlier_batches(self):
+        """Edits thrown away in the editor are not recovered."""
+        base = text_digest('hello')
+        self.log.insert(DATE, base, 5, ' world')
+        self.log.revert(DATE)
+        self.log.insert(DATE, base, 0, '> ')
+        self.assertEqual(self.recover(), {DATE: '> hello'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+"""
+Tests writing and reading back the on-disk formats of a journal.
+
+Usage: python3 -m unittest discover tests
+"""
+
+# test_storage.py
+#
+# Copyright 2025 Craig Foote
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import sys
+import tempfile
+import unittest
+import importlib.util
+
+# import the src directory as the journal package, as the benchmarks do
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+if 'journal' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('journal', os.path.join(SRC, '__init__.py'),
+                                                  submodule_search_locations=[SRC])
+    sys.modules['journal'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['journal'])
+
+# pylint: disable=wrong-import-position
+from journal.storage import ContainerFormat, LogFormat, PropertiesFormat, detect_format, read_journal
+
+HEADER = {'journal.salt': 'c2FsdA==', 'journal.iterations': '1000'}
+ITEMS = [('2024-05-01', b'first'), ('2024-05-02', b'\x00second\xff'), ('2024-05-04', b'fourth' * 100)]
+
+
+class StorageTest(unittest.TestCase):
+    """A temporary directory to write journals in."""
+
+    def setUp(self):
+        """Make the directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, 'test.journal')
+
+
+    def tearDown(self):
+        """Remove the directory."""
+        self.directory.cleanup()
+
+
+    def read(self):
+        """Read the journal as a new session would, returning its format, header and {date: ciphertext}."""
+        journal_format, header, ciphertexts = read_journal(self.file_path)
+        return journal_format, header, {date: bytes(ciphertexts[date]) for date in ciphertexts}
+
+
+class RoundTripTest(StorageTest):
+    """Each format reads back what it wrote."""
+
+    def check_round_trip(self, format_class, items):
+        """Write `items` in `format_class` and check they and the header are read back."""
+        format_class().write(self.file_path, HEADER, items)
+        journal_format, header, ciphertexts = self.read()
+        self.assertIsInstance(journal_format, format_class)
+        self.assertEqual(header, HEADER)
+        self.assertEqual(ciphertexts, dict(ITEMS))
+
+
+    def test_properties(self):
+        """A .properties journal."""
+        self.check_round_trip(PropertiesFormat, list(ITEMS))
+
+
+    def test_container(self):
+        """A container journal written from a list, as a save does."""
+        self.check_round_trip(ContainerFormat, list(ITEMS))
+
+
+    def test_container_streamed(self):
+        """A container journal written from a generator, as a rewrite does."""
+        self.check_round_trip(ContainerFormat, (item for item in ITEMS))
+
+
+    def test_container_header_alone(self):
+        """The header of a container journal is read without its entries."""
+        ContainerFormat().write(self.file_path, HEADER, list(ITEMS))
+        self.assertEqual(ContainerFormat().read_header(self.file_path), HEADER)
+
+
+    def test_log(self):
+        """A log journal."""
+        self.check_round_trip(LogFormat, list(ITEMS))
+
+
+    def test_new_journal(self):
+        """A missing file is a new journal, of no format."""
+        self.assertIsNone(detect_format(self.file_path))
+        self.assertEqual(read_journal(self.file_path)[1:], ({}, {}))
+
+
+class LogFormatTest(StorageTest):
+    """Appending to, recovering and compacting a log journal."""
+
+    def setUp(self):
+        """Write a log of ITEMS."""
+        super().setUp()
+        self.log = LogFormat()
+        self.log.write(self.file_path, HEADER, list(ITEMS))
+        self.saved = dict(ITEMS)
+
+
+    def save(self, changes):
+        """Save the (date, ciphertext or None) of `changes`, as `Journal.save` does."""
+        for date, ciphertext in changes:
+            if ciphertext is None:
+                self.saved.pop(date, None)
+            else:
+                self.saved[date] = ciphertext
+        self.log.save(self.file_path, HEADER, changes, lambda: sorted(self.saved.items()))
+
+
+    def test_appends_changes(self):
+        """A save appends its changes, the latest record of a date winning."""
+        size = os.path.getsize(self.file_path)
+        self.save([('2024-05-01', b'edited'), ('2024-05-03', b'third')])
+        self.assertGreater(os.path.getsize(self.file_path), size)
+        self.assertEqual(self.read()[2], self.saved)
+
+
+    def test_removal(self):
+        """A removal record drops its date, and a later entry brings it back."""
+        self.save([('2024-05-02', None)])
+        self.assertNotIn('2024-05-02', self.read()[2])
+        self.save([('2024-05-02', b'again')])
+        self.assertEqual(self.read()[2]['2024-05-02'], b'again')
+
+
+    def test_torn_last_record(self):
+        """A record cut short by a crash is dropped, keeping those before it."""
+        self.save([('2024-05-01', b'edited')])
+        expected = dict(self.saved)
+        self.save([('2024-05-03', b'third' * 10)])
+        with open(self.file_path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.file_path) - 5)
+        self.assertEqual(self.read()[2], expected)
+
+
+    def test_corrupt_last_record(self):
+        """A record failing its checksum is dropped, keeping those before it."""
+        expected = dict(self.saved)
+        self.save([('2024-05-01', b'edited')])
+        with open(self.file_path, 'r+b') as file:
+            file.seek(-1, os.SEEK_END)
+            file.write(b'?')
+        self.assertEqual(self.read()[2], expected)
+
+
+    def test_append_after_torn_record(self):
+        """The next session appends over a torn record, leaving nothing of it behind."""
+        self.save([('2024-05-03', b'third' * 100)])
+        with open(self.file_path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.file_path) - 2)
+        del self.saved['2024-05-03']
+        self.log, _, _ = read_journal(self.file_path)
+        self.save([('2024-05-05', b'fifth')])
+        self.assertEqual(self.read()[2], self.saved)
+        self.assertEqual(os.path.getsize(self.file_path), self.log.end)
+
+
+    def test_compaction_keeps_latest(self):
+        """Once mostly superseded records, the log is rewritten with the latest value of each date."""
+        self.log.COMPACT_SIZE = 4096
+        self.save([('2024-05-02', None)])
+        sizes = []
+        for revision in range(50):
+            self.save([('2024-05-01', b'%d' % revision * 100)])
+            sizes.append(os.path.getsize(self.file_path))
+        self.assertLess(min(sizes[10:]), max(sizes))
+        self.assertLess(self.log.garbage_ratio(), LogFormat.GARBAGE_RATIO)
+        self.assertEqual(self.read()[2], {'2024-05-01': b'49' * 100, '2024-05-04': ITEMS[2][1]})
+
+
+    def test_changed_header_rewrites(self):
+        """A new header, e.g. of a new key, is written by compacting rather than appended."""
+        header = dict(HEADER, **{'journal.iterations': '2000'})
+        self.log.save(self.file_path, header, [('2024-05-01', b'rekeyed')],
+                      lambda: [('2024-05-01', b'rekeyed')])
+        self.assertEqual(self.read()[1:], (header, {'2024-05-01': b'rekeyed'}))
+        self.assertEqual(self.log.garbage_ratio(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()